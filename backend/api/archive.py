@@ -0,0 +1,185 @@
+"""
+Local archive of transactions moved out of MongoDB.
+
+Archived documents are stored as gzipped JSON lines in one file per day
+(``YYYY-MM-DD.jsonl.gz``). Each archived batch is appended as its own gzip
+member, so the files stay readable with ``zcat`` while a lookup only has to
+decompress the member holding the requested id. A SQLite index next to the
+files maps each transaction id to its day file and member offset.
+"""
+import gzip
+import logging
+import os
+import sqlite3
+import zlib
+from collections import defaultdict
+from pathlib import Path
+from bson import json_util
+from django.conf import settings
+
+logger = logging.getLogger(__name__)
+
+INDEX_FILE = 'index.sqlite3'
+# wbits for zlib to read a single gzip member
+GZIP_WBITS = 16 + zlib.MAX_WBITS
+READ_CHUNK_SIZE = 64 * 1024
+
+
+class TransactionArchive:
+    def __init__(self, directory):
+        self.directory = Path(directory)
+
+    def _connect(self):
+        # A short-lived connection per call keeps the archive safe to use from
+        # any thread or forked worker
+        self.directory.mkdir(parents=True, exist_ok=True)
+        connection = sqlite3.connect(self.directory / INDEX_FILE)
+        connection.execute(
+            "CREATE TABLE IF NOT EXISTS archived ("
+            "id TEXT PRIMARY KEY, day TEXT NOT NULL, member_offset INTEGER NOT NULL)"
+        )
+        return connection
+
+    def _day_path(self, day):
+        return self.directory / f"{day}.jsonl.gz"
+
+    def write_batch(self, transactions):
+        """
+        Append transactions to their day files and index them. Files are
+        flushed to disk before the index is committed, so an id is only ever
+        indexed once its document is durable.
+        """
+        by_day = defaultdict(list)
+        for transaction in transactions:
+            by_day[transaction["timestamp"][:10]].append(transaction)
+
+        rows = []
+        for day, day_transactions in by_day.items():
+            lines = "".join(json_util.dumps(t) + "\n" for t in day_transactions)
+            with open(self._day_path(day), 'ab') as f:
+                offset = f.tell()
+                f.write(gzip.compress(lines.encode('utf-8')))
+                f.flush()
+                os.fsync(f.fileno())
+            rows.extend((t["id"], day, offset) for t in day_transactions)
+
+        connection = self._connect()
+        try:
+            with connection:
+                connection.executemany(
+                    "INSERT OR REPLACE INTO archived (id, day, member_offset) VALUES (?, ?, ?)",
+                    rows
+                )
+        finally:
+            connection.close()
+        return len(rows)
+
+    def lookup(self, transaction_id):
+        """Return an archived transaction document, or None."""
+        if not (self.directory / INDEX_FILE).exists():
+            return None
+        connection = self._connect()
+        try:
+            row = connection.execute(
+                "SELECT day, member_offset FROM archived WHERE id = ?", (transaction_id,)
+            ).fetchone()
+        finally:
+            connection.close()
+        if row is None:
+            return None
+
+        day, offset = row
+        for line in self._read_member(self._day_path(day), offset).splitlines():
+            if transaction_id in line:
+                transaction = json_util.loads(line)
+                if transaction.get("id") == transaction_id:
+                    return transaction
+        logger.error(f"Archive index points at {day} for {transaction_id} but the document is missing")
+        return None
+
+    def archived_ids(self, transaction_ids):
+        """Return which of these ids are in the archive."""
+        if not (self.directory / INDEX_FILE).exists():
+            return set()
+        transaction_ids = list(transaction_ids)
+        found = set()
+        connection = self._connect()
+        try:
+            # Stay under SQLite's bound-parameter limit
+            for start in range(0, len(transaction_ids), 500):
+                chunk = transaction_ids[start:start + 500]
+                placeholders = ",".join("?" * len(chunk))
+                found.update(row[0] for row in connection.execute(
+                    f"SELECT id FROM archived WHERE id IN ({placeholders})", chunk
+                ))
+        finally:
+            connection.close()
+        return found
+
+    def iter_transactions(self):
+        """
+        Yield every archived transaction, oldest day first. A document that
+        was written more than once (an archiver run interrupted before its
+        index commit) is only yielded from the member the index points at.
+        """
+        if not (self.directory / INDEX_FILE).exists():
+            return
+        for path in sorted(self.directory.glob("*.jsonl.gz")):
+            day = path.name[:-len(".jsonl.gz")]
+            connection = self._connect()
+            try:
+                indexed = dict(connection.execute(
+                    "SELECT id, member_offset FROM archived WHERE day = ?", (day,)
+                ))
+            finally:
+                connection.close()
+            for offset, text in self._iter_members(path):
+                for line in text.splitlines():
+                    transaction = json_util.loads(line)
+                    if indexed.get(transaction.get("id")) == offset:
+                        yield transaction
+
+    def _iter_members(self, path):
+        """Yield (offset, text) for each gzip member of a day file."""
+        with open(path, 'rb') as f:
+            buffered = b""
+            read_end = 0
+            member_offset = 0
+            while True:
+                decompressor = zlib.decompressobj(GZIP_WBITS)
+                chunks = []
+                data = buffered
+                fed = False
+                while not decompressor.eof:
+                    if not data:
+                        data = f.read(READ_CHUNK_SIZE)
+                        if not data:
+                            break
+                        read_end += len(data)
+                    fed = True
+                    chunks.append(decompressor.decompress(data))
+                    data = b""
+                if not fed:
+                    return
+                if not decompressor.eof:
+                    logger.error(f"Truncated gzip member at offset {member_offset} in {path}")
+                    return
+                yield member_offset, b"".join(chunks).decode('utf-8')
+                buffered = decompressor.unused_data
+                member_offset = read_end - len(buffered)
+
+    def _read_member(self, path, offset):
+        decompressor = zlib.decompressobj(GZIP_WBITS)
+        chunks = []
+        with open(path, 'rb') as f:
+            f.seek(offset)
+            while not decompressor.eof:
+                data = f.read(READ_CHUNK_SIZE)
+                if not data:
+                    break
+                chunks.append(decompressor.decompress(data))
+        return b"".join(chunks).decode('utf-8')
+
+
+def get_archive():
+    return TransactionArchive(settings.ARCHIVE_DIR)
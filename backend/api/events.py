@@ -0,0 +1,138 @@
+"""
+In-process fan-out of completed transactions to status subscribers.
+
+``GET /api/events`` subscribes to one or more transaction ids and waits on
+the broker instead of polling MongoDB. Subscribers are asyncio queues read
+by the async event stream view, so an open stream does not hold a thread;
+results are handed to them from any thread with ``call_soon_threadsafe``.
+Results stored by this process are published directly; with
+``EVENTS_CHANGE_STREAM`` enabled a MongoDB change stream also feeds results
+written by other worker processes. Streams read results already stored
+through one shared MongoDB client.
+"""
+import asyncio
+import logging
+import threading
+import time
+from django.conf import settings
+from .job_state import IN_PROGRESS_STATUSES, PUBLIC_FIELDS
+from .mongodb import MongoDB
+
+logger = logging.getLogger(__name__)
+
+
+class TransactionBroker:
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._subscribers = {}
+
+    def subscribe(self, transaction_ids):
+        """
+        Return an asyncio queue that receives the final document of each id.
+        Must be called from the event loop that reads the queue.
+        """
+        subscriber = (asyncio.get_running_loop(), asyncio.Queue(maxsize=len(transaction_ids) * 2))
+        with self._lock:
+            for transaction_id in transaction_ids:
+                self._subscribers.setdefault(transaction_id, set()).add(subscriber)
+        return subscriber[1]
+
+    def unsubscribe(self, transaction_ids, queue):
+        with self._lock:
+            for transaction_id in transaction_ids:
+                subscribers = self._subscribers.get(transaction_id)
+                if subscribers is None:
+                    continue
+                subscribers.difference_update({s for s in subscribers if s[1] is queue})
+                if not subscribers:
+                    del self._subscribers[transaction_id]
+
+    def publish(self, transaction):
+        """Deliver a completed transaction to everyone waiting on its id. Thread-safe."""
+        with self._lock:
+            subscribers = list(self._subscribers.get(transaction["id"], ()))
+        for loop, queue in subscribers:
+            try:
+                loop.call_soon_threadsafe(_deliver, queue, transaction)
+            except RuntimeError:
+                # The subscriber's event loop has closed
+                pass
+
+
+def _deliver(queue, transaction):
+    try:
+        queue.put_nowait(transaction)
+    except asyncio.QueueFull:
+        # Subscriber already has a result queued for this id
+        pass
+
+
+_mongo_db = None
+_mongo_db_lock = threading.Lock()
+
+def _get_db():
+    # One shared connection for event stream reads; MongoClient is thread-safe
+    global _mongo_db
+    with _mongo_db_lock:
+        if _mongo_db is None or _mongo_db.db is None:
+            _mongo_db = MongoDB()
+            if _mongo_db.get_collection('transactions') is None:
+                raise RuntimeError("Could not access transactions collection")
+        return _mongo_db.db
+
+def find_completed_transactions(transaction_ids):
+    """Read the stored results of any of these transactions that have finished scoring."""
+    try:
+        return list(_get_db()['transactions'].find(
+            {"id": {"$in": list(transaction_ids)}, "status": {"$nin": IN_PROGRESS_STATUSES}},
+            PUBLIC_FIELDS
+        ))
+    except Exception as e:
+        logger.error(f"Error reading stored transactions for event stream: {e}")
+        return []
+
+
+def _watch_change_stream(broker):
+    """Publish completed transactions written by any process."""
+    pipeline = [
+        {"$match": {
+            "operationType": {"$in": ["insert", "update", "replace"]},
+            "fullDocument.status": {"$nin": IN_PROGRESS_STATUSES},
+        }},
+        {"$project": {f"fullDocument.{field}": 0 for field in PUBLIC_FIELDS}},
+    ]
+    delay = 1
+    while True:
+        try:
+            collection = MongoDB().get_collection('transactions')
+            if collection is None:
+                raise RuntimeError("Could not access transactions collection")
+            with collection.watch(pipeline, full_document='updateLookup') as stream:
+                logger.info("Watching transactions change stream")
+                delay = 1
+                for change in stream:
+                    document = change.get("fullDocument")
+                    if document:
+                        broker.publish(document)
+        except Exception as e:
+            logger.error(f"Transactions change stream failed, retrying in {delay}s: {e}")
+            time.sleep(delay)
+            delay = min(delay * 2, 60)
+
+
+_broker = None
+_broker_lock = threading.Lock()
+
+def get_broker():
+    """Return the process-wide broker, starting the change stream feed if enabled."""
+    global _broker
+    with _broker_lock:
+        if _broker is None:
+            _broker = TransactionBroker()
+            if settings.EVENTS_CHANGE_STREAM:
+                thread = threading.Thread(
+                    target=_watch_change_stream, args=(_broker,),
+                    name="transactions-change-stream", daemon=True
+                )
+                thread.start()
+    return _broker
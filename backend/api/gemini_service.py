@@ -3,6 +3,8 @@ import google.generativeai as genai
 from django.conf import settings
 import logging
 import json
+import threading
+from datetime import datetime
 from typing import Dict, Any, Optional
 
 logger = logging.getLogger(__name__)
@@ -10,6 +12,34 @@ logger = logging.getLogger(__name__)
 # Configure the Gemini API
 genai.configure(api_key=settings.GEMINI_API_KEY)
 
+# Outcome of recent Gemini calls, reported by the health check
+_model_status_lock = threading.Lock()
+_model_status = {
+    "last_success": None,
+    "last_failure": None,
+    "last_error": None,
+    "consecutive_failures": 0,
+}
+
+def _record_model_result(error: Optional[str] = None) -> None:
+    with _model_status_lock:
+        if error is None:
+            _model_status["last_success"] = datetime.now().isoformat()
+            _model_status["consecutive_failures"] = 0
+        else:
+            _model_status["last_failure"] = datetime.now().isoformat()
+            _model_status["last_error"] = error
+            _model_status["consecutive_failures"] += 1
+
+def get_model_status() -> Dict[str, Any]:
+    """Return a copy of the recent Gemini call outcomes."""
+    with _model_status_lock:
+        return dict(_model_status)
+
+def score_to_status(score: float) -> str:
+    """Map a risk score to the status stored on a transaction."""
+    return "Clear" if score < 0.5 else "Suspicious" if score < 0.8 else "Fraudulent"
+
 def analyze_transaction(
     sender: str, 
     receiver: str, 
@@ -95,10 +125,12 @@ def analyze_transaction(
                         raise Exception("No suitable models available")
                 except Exception as e:
                     logger.error(f"Could not find any working models: {e}")
+                    _record_model_result(f"No working models: {e}")
                     return _mock_analyze_transaction(sender, receiver, amount, description)
         
         if not response or not response.text:
             logger.error("Empty response from Gemini")
+            _record_model_result("Empty response from Gemini")
             return _mock_analyze_transaction(sender, receiver, amount, description)
 
         # Parse Gemini's response
@@ -166,6 +198,7 @@ Risk Score: {score:.2f}
 {generate_recommendations(score)}
 """
 
+        _record_model_result()
         return {
             "score": score,
             "explanation": explanation,
@@ -174,6 +207,7 @@ Risk Score: {score:.2f}
 
     except Exception as e:
         logger.error(f"Error in Gemini analysis: {e}")
+        _record_model_result(str(e))
         return _mock_analyze_transaction(sender, receiver, amount, description)
 
 def generate_recommendations(score: float, risk_factors: list) -> str:
@@ -0,0 +1,117 @@
+"""
+Background health probe.
+
+``health_check`` is called several times a second by load balancers, so it
+answers from state kept here instead of connecting to MongoDB on every call.
+A daemon thread probes MongoDB every ``HEALTH_PROBE_INTERVAL`` seconds and
+keeps a short history of probe latencies. Until the first probe has
+finished the state is reported as ``starting``.
+"""
+import logging
+import threading
+import time
+from collections import deque
+from datetime import datetime
+from django.conf import settings
+from .mongodb import MongoDB
+
+logger = logging.getLogger(__name__)
+
+
+class HealthMonitor:
+    def __init__(self, interval, history_size):
+        self.interval = interval
+        self._lock = threading.Lock()
+        self._stopping = threading.Event()
+        self._thread = None
+        self._mongo_db = None
+        self._latencies = deque(maxlen=history_size)
+        self._state = {
+            "state": "starting",
+            "connected": False,
+            "collection_available": False,
+            "last_probe": None,
+            "last_error": None,
+        }
+        self._last_write = None
+
+    def start(self):
+        """Start probing in the background; the first probe runs straight away."""
+        with self._lock:
+            if self._thread is not None:
+                return
+            self._stopping.clear()
+            self._thread = threading.Thread(target=self._run, name="health-probe", daemon=True)
+            self._thread.start()
+
+    def stop(self, timeout=None):
+        self._stopping.set()
+        with self._lock:
+            thread, self._thread = self._thread, None
+        if thread is not None:
+            thread.join(timeout=self.interval + 1 if timeout is None else timeout)
+
+    def record_write(self):
+        """Note a successful write of a transaction result."""
+        self._last_write = datetime.now().isoformat()
+
+    def probe(self):
+        """Ping MongoDB once and update the cached state."""
+        state = {"connected": False, "collection_available": False, "last_error": None}
+        latency_ms = None
+        try:
+            if self._mongo_db is None or self._mongo_db.client is None:
+                self._mongo_db = MongoDB()
+            if self._mongo_db.client is None:
+                raise RuntimeError("MongoDB connection failed")
+            started = time.perf_counter()
+            self._mongo_db.client.admin.command('ping')
+            latency_ms = round((time.perf_counter() - started) * 1000, 2)
+            state["connected"] = True
+            state["collection_available"] = 'transactions' in self._mongo_db.db.list_collection_names()
+        except Exception as e:
+            logger.warning(f"Health probe failed: {e}")
+            state["last_error"] = str(e)
+            # Reconnect on the next probe
+            self._mongo_db = None
+
+        state["state"] = "up" if state["connected"] else "down"
+        state["last_probe"] = datetime.now().isoformat()
+        with self._lock:
+            self._state = state
+            if latency_ms is not None:
+                self._latencies.append(latency_ms)
+
+    def snapshot(self):
+        """Return the cached health state without touching MongoDB."""
+        with self._lock:
+            state = dict(self._state)
+            state["latency_ms"] = self._latencies[-1] if self._latencies else None
+            state["latency_history_ms"] = list(self._latencies)
+        state["last_successful_write"] = self._last_write
+        return state
+
+    def _run(self):
+        while True:
+            try:
+                self.probe()
+            except Exception as e:
+                logger.error(f"Health probe loop error: {e}")
+            if self._stopping.wait(self.interval):
+                return
+
+
+_monitor = None
+_monitor_lock = threading.Lock()
+
+def get_health_monitor():
+    """Return the process-wide health monitor, starting it on first use."""
+    global _monitor
+    with _monitor_lock:
+        if _monitor is None:
+            _monitor = HealthMonitor(
+                interval=settings.HEALTH_PROBE_INTERVAL,
+                history_size=settings.HEALTH_LATENCY_HISTORY
+            )
+            _monitor.start()
+    return _monitor
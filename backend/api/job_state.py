@@ -0,0 +1,18 @@
+"""
+Job bookkeeping the scoring queue (see jobs.py) keeps on transaction
+documents. Kept apart from the queue so modules that read transactions can
+use it without importing the workers.
+"""
+# Statuses of a job that has not finished yet
+IN_PROGRESS_STATUSES = ["Pending", "Scoring"]
+
+# Fields only the queue needs; removed once the result is written
+BOOKKEEPING_FIELDS = ["owner", "lease_expires", "claimed_at", "priority"]
+
+# Projection for transaction documents handed to clients
+PUBLIC_FIELDS = {"_id": 0, **{field: 0 for field in BOOKKEEPING_FIELDS}}
+
+
+def public_document(transaction):
+    """Copy of a transaction document without MongoDB's _id or job bookkeeping."""
+    return {key: value for key, value in transaction.items() if key not in PUBLIC_FIELDS}
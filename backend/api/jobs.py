@@ -0,0 +1,314 @@
+"""
+Background scoring jobs.
+
+In async mode ``process_transaction`` stores a ``Pending`` document and
+submits it here. A bounded pool of worker threads takes jobs off a priority
+queue, runs the analysis and updates the stored document when scoring
+finishes. The ``Pending`` documents in MongoDB double as the persistent
+queue.
+
+Every queued job is leased to the process that holds it: the document
+carries that queue's ``owner`` id and a ``lease_expires`` time the queue
+keeps renewing while the job is in memory. A worker claims a job by moving
+it from ``Pending`` to ``Scoring`` under its own owner id, and the result is
+only written while that claim still holds, so each job is scored and stored
+once. Jobs whose lease has expired belonged to a process that died and are
+taken over by ``recover_expired_jobs``.
+
+Leases are UTC dates. Renewal and expiry are computed from the MongoDB
+server's clock (``$$NOW``), so queues on hosts with different time zones or
+skewed clocks agree on which leases are live.
+"""
+import itertools
+import logging
+import os
+import socket
+import threading
+import time
+import uuid
+from datetime import datetime, timedelta, timezone
+from queue import PriorityQueue, Full, Empty
+from django.conf import settings
+from .job_state import IN_PROGRESS_STATUSES, BOOKKEEPING_FIELDS
+from .mongodb import MongoDB
+from .scoring import score_transaction, transaction_stored
+
+logger = logging.getLogger(__name__)
+
+PRIORITIES = {
+    'high': 0,
+    'normal': 1,
+    'low': 2,
+}
+
+# Fields of a transaction document a job needs to score it
+JOB_FIELDS = {"_id": 0, "id": 1, "sender": 1, "receiver": 1, "amount": 1,
+              "description": 1, "priority": 1, "lease_expires": 1}
+
+# Update that drops the job bookkeeping once a job has finished
+_FINISHED = {field: "" for field in BOOKKEEPING_FIELDS}
+
+
+class ScoringJobQueue:
+    def __init__(self, workers, max_size, max_retries, retry_delay, lease_seconds):
+        self.workers = workers
+        self.max_retries = max_retries
+        self.retry_delay = retry_delay
+        self.lease_seconds = lease_seconds
+        self.owner = f"{socket.gethostname()}:{os.getpid()}:{uuid.uuid4().hex[:8]}"
+        self._queue = PriorityQueue(maxsize=max_size)
+        self._counter = itertools.count()
+        self._threads = []
+        self._lock = threading.Lock()
+        self._stopping = threading.Event()
+        # Ids of jobs this queue holds (queued, scoring or waiting to retry)
+        self._owned = set()
+        self._retry_timers = {}
+
+    def start(self):
+        """Start the worker threads and the lease maintenance loop."""
+        with self._lock:
+            if self._threads:
+                return
+            self._stopping.clear()
+            for i in range(self.workers):
+                thread = threading.Thread(target=self._run, name=f"scoring-worker-{i}", daemon=True)
+                thread.start()
+                self._threads.append(thread)
+            maintenance = threading.Thread(target=self._maintenance_loop, name="scoring-leases", daemon=True)
+            maintenance.start()
+            self._threads.append(maintenance)
+        logger.info(f"Started {self.workers} scoring workers as {self.owner}")
+
+    def lease(self):
+        """
+        Fields that lease a newly stored Pending job to this queue. This first
+        lease uses the local clock; renewals use the server's.
+        """
+        return {
+            "owner": self.owner,
+            "lease_expires": datetime.now(timezone.utc) + timedelta(seconds=self.lease_seconds)
+        }
+
+    def _server_lease(self):
+        # Aggregation-pipeline $set fields leasing a job from the server's clock
+        return {
+            "owner": self.owner,
+            "lease_expires": {"$add": ["$$NOW", self.lease_seconds * 1000]}
+        }
+
+    def submit(self, transaction, priority='normal'):
+        """Queue a transaction for scoring. Returns False if the queue is full."""
+        with self._lock:
+            self._owned.add(transaction["id"])
+        if self._put(PRIORITIES.get(priority, PRIORITIES['normal']), 0, transaction):
+            return True
+        self._release(transaction["id"])
+        return False
+
+    def depth(self):
+        """Number of jobs waiting for a worker."""
+        return self._queue.qsize()
+
+    def shutdown(self, timeout=None):
+        """
+        Wait up to ``timeout`` seconds for queued jobs to finish, then stop
+        the workers. Retries still waiting on a timer are cancelled; their
+        documents keep their lease until it expires and another process
+        recovers them.
+        """
+        deadline = time.monotonic() + timeout if timeout is not None else None
+        while self._queue.unfinished_tasks:
+            if deadline is not None and time.monotonic() >= deadline:
+                logger.warning(f"Scoring queue shutdown timed out with {self.depth()} jobs queued")
+                break
+            time.sleep(0.1)
+        self._stopping.set()
+        with self._lock:
+            timers = list(self._retry_timers.values())
+            self._retry_timers.clear()
+        for timer in timers:
+            timer.cancel()
+        if timers:
+            logger.info(f"Cancelled {len(timers)} scoring retries; they will be recovered after their lease expires")
+        with self._lock:
+            threads, self._threads = self._threads, []
+        # Idle workers notice _stopping within a second; one still scoring past
+        # the deadline is a daemon thread and is left behind
+        for thread in threads:
+            thread.join(timeout=1 if deadline is None else max(0, deadline - time.monotonic()))
+
+    def renew_leases(self):
+        """Extend the lease on every job this queue still holds."""
+        with self._lock:
+            owned = list(self._owned)
+        if not owned:
+            return
+        collection = MongoDB().get_collection('transactions')
+        if collection is None:
+            logger.error("Could not access transactions collection to renew scoring leases")
+            return
+        collection.update_many(
+            {"id": {"$in": owned}, "owner": self.owner, "status": {"$in": IN_PROGRESS_STATUSES}},
+            [{"$set": self._server_lease()}]
+        )
+
+    def recover_expired_jobs(self):
+        """Take over and re-queue jobs whose owning process stopped renewing their lease."""
+        collection = MongoDB().get_collection('transactions')
+        if collection is None:
+            logger.error("Could not access transactions collection for job recovery")
+            return 0
+
+        recovered = 0
+        expired = {"status": {"$in": IN_PROGRESS_STATUSES}, "$expr": {"$lt": ["$lease_expires", "$$NOW"]}}
+        for doc in collection.find(expired, JOB_FIELDS):
+            # Take the lease only if nobody renewed or recovered it meanwhile
+            claimed = collection.find_one_and_update(
+                {"id": doc["id"], "status": {"$in": IN_PROGRESS_STATUSES}, "lease_expires": doc["lease_expires"]},
+                [{"$set": {"status": "Pending", **self._server_lease()}}, {"$unset": "claimed_at"}]
+            )
+            if claimed is None:
+                continue
+            if not self.submit(doc, doc.get("priority", "normal")):
+                # Our new lease lapses unrenewed and the job is recovered again later
+                logger.warning("Scoring queue full, stopping job recovery")
+                break
+            recovered += 1
+
+        if recovered:
+            logger.info(f"Recovered {recovered} scoring jobs with expired leases")
+        return recovered
+
+    def _put(self, priority, attempt, transaction):
+        try:
+            self._queue.put_nowait((priority, next(self._counter), attempt, transaction))
+            return True
+        except Full:
+            return False
+
+    def _release(self, transaction_id):
+        with self._lock:
+            self._owned.discard(transaction_id)
+
+    def _run(self):
+        mongo_db = None
+        while not self._stopping.is_set():
+            try:
+                priority, _, attempt, transaction = self._queue.get(timeout=1)
+            except Empty:
+                continue
+            try:
+                if mongo_db is None or mongo_db.db is None:
+                    mongo_db = MongoDB()
+                self._process(mongo_db, transaction, attempt)
+                self._release(transaction["id"])
+            except Exception as e:
+                logger.error(f"Scoring job for transaction {transaction['id']} failed: {e}")
+                self._retry_or_fail(priority, attempt, transaction, e)
+            finally:
+                self._queue.task_done()
+
+    def _process(self, mongo_db, transaction, attempt=0):
+        collection = mongo_db.get_collection('transactions')
+        if collection is None:
+            raise RuntimeError("Could not access transactions collection")
+
+        # Claim the job. A retry resumes whatever state its failed attempt left.
+        claimed = collection.find_one_and_update(
+            {"id": transaction["id"], "owner": self.owner,
+             "status": {"$in": IN_PROGRESS_STATUSES} if attempt else "Pending"},
+            {"$set": {"status": "Scoring", "claimed_at": datetime.now().isoformat()}}
+        )
+        if claimed is None:
+            logger.info(f"Transaction {transaction['id']} is no longer leased to this queue, skipping")
+            return
+
+        result = score_transaction(
+            sender=transaction["sender"],
+            receiver=transaction["receiver"],
+            amount=transaction["amount"],
+            description=transaction.get("description", '')
+        )
+        result["scored_at"] = datetime.now().isoformat()
+        # Only store the result while the claim still holds
+        stored = collection.update_one(
+            {"id": transaction["id"], "owner": self.owner, "status": "Scoring"},
+            {"$set": result, "$unset": _FINISHED}
+        )
+        if stored.matched_count == 0:
+            logger.warning(f"Lost the lease on transaction {transaction['id']}, discarding its result")
+            return
+        logger.info(f"Scoring job completed for transaction {transaction['id']}")
+        transaction_stored({**claimed, **result})
+
+    def _retry_or_fail(self, priority, attempt, transaction, error):
+        if attempt < self.max_retries and not self._stopping.is_set():
+            delay = self.retry_delay * (2 ** attempt)
+            logger.info(f"Retrying transaction {transaction['id']} in {delay:.1f}s (attempt {attempt + 1})")
+            timer = threading.Timer(delay, self._retry, args=(priority, attempt + 1, transaction))
+            timer.daemon = True
+            with self._lock:
+                self._retry_timers[transaction["id"]] = timer
+            timer.start()
+            return
+
+        self._release(transaction["id"])
+        try:
+            collection = MongoDB().get_collection('transactions')
+            if collection is not None:
+                failed = {"status": "Failed", "error": str(error)}
+                marked = collection.update_one(
+                    {"id": transaction["id"], "owner": self.owner, "status": {"$in": IN_PROGRESS_STATUSES}},
+                    {"$set": failed, "$unset": _FINISHED}
+                )
+                if marked.matched_count:
+                    transaction_stored({**transaction, **failed})
+        except Exception as e:
+            logger.error(f"Could not mark transaction {transaction['id']} as failed: {e}")
+
+    def _retry(self, priority, attempt, transaction):
+        with self._lock:
+            self._retry_timers.pop(transaction["id"], None)
+        if not self._put(priority, attempt, transaction):
+            # Leave the claim to expire so another process recovers the job
+            logger.warning(f"Scoring queue full, dropping retry of transaction {transaction['id']}")
+            self._release(transaction["id"])
+
+    def _maintenance_loop(self):
+        # Renew leases several times per lease period; recover once per period
+        interval = self.lease_seconds / 3
+        tick = 0
+        while True:
+            try:
+                self.renew_leases()
+                if tick % 3 == 0:
+                    self.recover_expired_jobs()
+            except Exception as e:
+                logger.error(f"Scoring lease maintenance failed: {e}")
+            tick += 1
+            if self._stopping.wait(interval):
+                return
+
+
+_job_queue = None
+_job_queue_lock = threading.Lock()
+
+def get_job_queue():
+    """Return the process-wide scoring queue, starting it on first use."""
+    global _job_queue
+    with _job_queue_lock:
+        if _job_queue is None:
+            _job_queue = ScoringJobQueue(
+                workers=settings.SCORING_WORKERS,
+                max_size=settings.SCORING_QUEUE_MAX_SIZE,
+                max_retries=settings.SCORING_JOB_MAX_RETRIES,
+                retry_delay=settings.SCORING_JOB_RETRY_DELAY,
+                lease_seconds=settings.SCORING_JOB_LEASE_SECONDS
+            )
+            _job_queue.start()
+    return _job_queue
+
+def current_job_queue():
+    """Return the scoring queue if this process has started one, else None."""
+    return _job_queue
@@ -0,0 +1,116 @@
+"""
+Process lifecycle hooks for serving processes.
+
+``start_background`` starts the process-wide background components (the
+health probe and, in async mode, the scoring workers that also recover jobs
+left behind by stopped processes) before the first request arrives. Single-process servers
+call it when they load the application in fraud_detection/wsgi.py or
+asgi.py.
+
+Gunicorn (see gunicorn.conf.py) preloads the app in the master with
+``preload`` so workers share its memory copy-on-write. Background threads
+and network clients do not survive a fork, so each worker calls
+``after_fork`` to drop anything the master created, reconfigure Gemini and
+start its own background components. ``shutdown`` drains queued work before
+a worker exits, within whatever is left of the shutdown budget since
+``mark_shutdown_started``.
+"""
+import logging
+import signal
+import time
+from importlib import import_module
+import google.generativeai as genai
+from django.conf import settings
+from django.urls import get_resolver
+from . import events, health, jobs, shadow, stats
+
+logger = logging.getLogger(__name__)
+
+
+def preload():
+    """Import and build everything that is safe to share between workers."""
+    # Pulls in the serializers, Gemini client library and pymongo
+    import_module('api.views')
+    # Compiles every route pattern once
+    get_resolver().reverse_dict
+    logger.info("Application preloaded")
+
+def after_fork():
+    """Reset per-process state inherited from the master."""
+    genai.configure(api_key=settings.GEMINI_API_KEY)
+    jobs._job_queue = None
+    events._broker = None
+    events._mongo_db = None
+    health._monitor = None
+    shadow._shadow_scorer = None
+    stats._mongo_db = None
+    start_background()
+
+def start_background():
+    """Start this process's background components ahead of the first request."""
+    # Probe from the start so the first health checks are answered from cache
+    health.get_health_monitor()
+    # Renew and recover job leases even before this process takes new jobs
+    if settings.ASYNC_SCORING:
+        jobs.get_job_queue()
+
+_shutdown_started = None
+
+def mark_shutdown_started():
+    """Record when this worker was told to stop; the first call wins."""
+    global _shutdown_started
+    if _shutdown_started is None:
+        _shutdown_started = time.monotonic()
+
+def watch_shutdown_signals():
+    """
+    Call ``mark_shutdown_started`` on SIGTERM, SIGINT or SIGQUIT, then pass
+    the signal on to the handler the server had installed. Call it after the
+    server has set up its own signal handling.
+    """
+    for sig in (signal.SIGTERM, signal.SIGINT, signal.SIGQUIT):
+        signal.signal(sig, _marking_handler(signal.getsignal(sig)))
+
+def _marking_handler(previous):
+    def handler(signum, frame):
+        mark_shutdown_started()
+        if callable(previous):
+            previous(signum, frame)
+        elif previous != signal.SIG_IGN:
+            # Keep the default action, e.g. terminating the process
+            signal.signal(signum, signal.SIG_DFL)
+            signal.raise_signal(signum)
+    return handler
+
+def remaining_budget(total, margin):
+    """
+    Seconds left of a ``total`` second shutdown budget, keeping ``margin``
+    spare. A worker that was never signalled is exiting on its own (e.g.
+    after max_requests) and gets the whole budget.
+    """
+    elapsed = time.monotonic() - _shutdown_started if _shutdown_started is not None else 0
+    return max(0, total - elapsed - margin)
+
+def shutdown(timeout=None):
+    """
+    Finish queued scoring jobs and shadow samples, then stop background
+    threads, taking at most ``timeout`` seconds overall. Scoring retries
+    still waiting on a timer are cancelled; their documents stay leased
+    until the lease expires and another worker recovers them.
+    """
+    deadline = time.monotonic() + timeout if timeout is not None else None
+
+    def remaining():
+        return None if deadline is None else max(0, deadline - time.monotonic())
+
+    job_queue = jobs.current_job_queue()
+    if job_queue is not None:
+        logger.info(f"Draining {job_queue.depth()} queued scoring jobs")
+        job_queue.shutdown(timeout=remaining())
+    if shadow._shadow_scorer is not None:
+        shadow._shadow_scorer.shutdown(timeout=remaining())
+    if health._monitor is not None:
+        health._monitor.stop(timeout=remaining())
+    for mongo_db in (stats._mongo_db, events._mongo_db):
+        if mongo_db is not None and mongo_db.client is not None:
+            mongo_db.client.close()
@@ -0,0 +1,47 @@
+from datetime import datetime, timedelta
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from api.archive import get_archive
+from api.job_state import IN_PROGRESS_STATUSES, PUBLIC_FIELDS
+from api.mongodb import MongoDB
+
+
+class Command(BaseCommand):
+    help = ("Move transactions older than the hot window out of MongoDB into the local archive. "
+            "Run it on a schedule (e.g. daily from cron); only one archiver should run at a time.")
+
+    def add_arguments(self, parser):
+        parser.add_argument('--days', type=int, default=settings.TRANSACTION_HOT_DAYS,
+                            help="Keep transactions newer than this many days in MongoDB")
+        parser.add_argument('--batch-size', type=int, default=settings.ARCHIVE_BATCH_SIZE,
+                            help="Transactions archived and removed from MongoDB per batch")
+
+    def handle(self, *args, **options):
+        collection = MongoDB().get_collection('transactions')
+        if collection is None:
+            raise CommandError("Could not access transactions collection")
+
+        cutoff = (datetime.now() - timedelta(days=options['days'])).isoformat()
+        # Transactions still being scored stay until a worker has finished them
+        query = {"timestamp": {"$lt": cutoff}, "status": {"$nin": IN_PROGRESS_STATUSES}}
+        archive = get_archive()
+        self.stdout.write(f"Archiving transactions older than {cutoff} to {archive.directory}")
+
+        total = 0
+        while True:
+            # Oldest first; each batch is removed before the next is read. Job
+            # bookkeeping left on old documents is not archived.
+            batch = list(
+                collection.find(query, PUBLIC_FIELDS)
+                .sort([("timestamp", 1), ("id", 1)])
+                .hint('timestamp_id')
+                .limit(options['batch_size'])
+            )
+            if not batch:
+                break
+            archive.write_batch(batch)
+            collection.delete_many({"id": {"$in": [t["id"] for t in batch]}})
+            total += len(batch)
+            self.stdout.write(f"Archived {total} transactions...")
+
+        self.stdout.write(self.style.SUCCESS(f"Archived {total} transactions"))
@@ -0,0 +1,27 @@
+from datetime import datetime, timedelta
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from api.mongodb import MongoDB
+from api.stats import compact_party_stats, hour_of, PARTY_STATS_COLLECTION, PARTY_TOP_COLLECTION
+
+
+class Command(BaseCommand):
+    help = ("Fold per-address sender/receiver counters older than the live window into each hour's "
+            "top addresses, keeping the statistics collections small. Run it on a schedule (e.g. "
+            "hourly from cron); only one compaction should run at a time.")
+
+    def add_arguments(self, parser):
+        parser.add_argument('--hours', type=int, default=settings.STATS_PARTY_LIVE_HOURS,
+                            help="Keep per-address counters for this many recent hours")
+
+    def handle(self, *args, **options):
+        mongo_db = MongoDB()
+        for collection_name in (PARTY_STATS_COLLECTION, PARTY_TOP_COLLECTION):
+            if mongo_db.get_collection(collection_name) is None:
+                raise CommandError(f"Could not access {collection_name} collection")
+
+        before_hour = hour_of((datetime.now() - timedelta(hours=options['hours'])).isoformat())
+        compacted = compact_party_stats(mongo_db.db, before_hour, settings.STATS_PARTY_TOP_K)
+        self.stdout.write(self.style.SUCCESS(
+            f"Compacted {compacted} hourly sender/receiver lists before {before_hour}"
+        ))
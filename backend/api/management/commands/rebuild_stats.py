@@ -0,0 +1,85 @@
+from django.core.management.base import BaseCommand, CommandError
+from datetime import datetime, timedelta
+from django.conf import settings
+from api.archive import get_archive
+from api.job_state import IN_PROGRESS_STATUSES
+from api.mongodb import MongoDB
+from api.stats import (RollupBatch, ROLLUP_FIELDS, STATS_COLLECTION, PARTY_STATS_COLLECTION,
+                       PARTY_TOP_COLLECTION, compact_party_stats, hour_of)
+
+
+class Command(BaseCommand):
+    help = ("Rebuild the hourly statistics rollups from the transactions collection and the local "
+            "archive, so history moved out by archive_transactions is kept. Results stored while the "
+            "rebuild runs may be counted twice, so run it when traffic is quiet.")
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=5000,
+                            help="Transactions accumulated in memory per rollup write")
+
+    def handle(self, *args, **options):
+        mongo_db = MongoDB()
+        collection = mongo_db.get_collection('transactions')
+        if collection is None:
+            raise CommandError("Could not access transactions collection")
+
+        for collection_name in (STATS_COLLECTION, PARTY_STATS_COLLECTION, PARTY_TOP_COLLECTION):
+            rollups = mongo_db.get_collection(collection_name)
+            if rollups is None:
+                raise CommandError(f"Could not access {collection_name} collection")
+            rollups.delete_many({})
+        self.stdout.write("Cleared existing rollups")
+
+        self.batch = RollupBatch()
+        self.pending = 0
+        self.total = 0
+        self.batch_size = options['batch_size']
+        self.db = mongo_db.db
+
+        archive = get_archive()
+        for transaction in archive.iter_transactions():
+            if transaction.get("score") is not None:
+                self._add(transaction)
+        self._flush()
+        archived_total = self.total
+        self.stdout.write(f"Rolled up {archived_total} archived transactions")
+
+        # A transaction archived but not yet deleted from MongoDB (an archiver
+        # run interrupted between the two) was already counted above
+        hot = []
+        query = {"status": {"$nin": [*IN_PROGRESS_STATUSES, "Failed"]}, "score": {"$ne": None}}
+        for transaction in collection.find(query, {**ROLLUP_FIELDS, "id": 1}, batch_size=self.batch_size):
+            hot.append(transaction)
+            if len(hot) >= self.batch_size:
+                self._add_hot(archive, hot)
+                hot = []
+        self._add_hot(archive, hot)
+        self._flush()
+
+        before_hour = hour_of((datetime.now() - timedelta(hours=settings.STATS_PARTY_LIVE_HOURS)).isoformat())
+        compacted = compact_party_stats(self.db, before_hour, settings.STATS_PARTY_TOP_K)
+        self.stdout.write(f"Compacted {compacted} hourly sender/receiver lists")
+
+        self.stdout.write(self.style.SUCCESS(
+            f"Rebuilt statistics from {self.total} transactions "
+            f"({archived_total} archived, {self.total - archived_total} in MongoDB)"
+        ))
+
+    def _add_hot(self, archive, transactions):
+        archived = archive.archived_ids(t["id"] for t in transactions)
+        for transaction in transactions:
+            if transaction["id"] not in archived:
+                self._add(transaction)
+
+    def _add(self, transaction):
+        self.batch.add(transaction)
+        self.pending += 1
+        if self.pending >= self.batch_size:
+            self._flush()
+            self.stdout.write(f"Rolled up {self.total} transactions...")
+
+    def _flush(self):
+        if self.pending:
+            self.batch.write(self.db)
+            self.total += self.pending
+            self.pending = 0
@@ -0,0 +1,167 @@
+import time
+from collections import Counter
+from concurrent.futures import ThreadPoolExecutor
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from django.utils.module_loading import import_string
+from api.job_state import IN_PROGRESS_STATUSES
+from api.mongodb import MongoDB
+from api.shadow import run_scorer
+
+# Fields a scorer needs from a stored transaction
+REPLAY_FIELDS = {"_id": 0, "id": 1, "sender": 1, "receiver": 1, "amount": 1, "description": 1, "timestamp": 1}
+
+
+class ScorerStats:
+    """Running latency totals for one scorer, kept constant-size."""
+
+    def __init__(self, name):
+        self.name = name
+        self.calls = 0
+        self.errors = 0
+        self.total_ms = 0.0
+        self.max_ms = 0.0
+        self.statuses = Counter()
+
+    def add(self, status, latency_ms):
+        self.calls += 1
+        self.total_ms += latency_ms
+        self.max_ms = max(self.max_ms, latency_ms)
+        self.statuses[status] += 1
+
+
+class Command(BaseCommand):
+    help = "Replay stored transactions through a baseline and a candidate scorer and compare the results"
+
+    def add_arguments(self, parser):
+        parser.add_argument('--candidate', default=settings.SHADOW_SCORER,
+                            help="Dotted path of the candidate scorer (defaults to SHADOW_SCORER)")
+        parser.add_argument('--baseline', default='api.gemini_service.analyze_transaction',
+                            help="Dotted path of the baseline scorer")
+        parser.add_argument('--since', help="Only replay transactions with a timestamp at or after this ISO time")
+        parser.add_argument('--limit', type=int, default=0, help="Maximum number of transactions to replay")
+        parser.add_argument('--workers', type=int, default=4, help="Number of parallel scoring threads")
+        parser.add_argument('--batch-size', type=int, default=500,
+                            help="Transactions read from MongoDB and scored per batch")
+
+    def handle(self, *args, **options):
+        if not options['candidate']:
+            raise CommandError("No candidate scorer given (use --candidate or set SHADOW_SCORER)")
+        try:
+            baseline = import_string(options['baseline'])
+            candidate = import_string(options['candidate'])
+        except ImportError as e:
+            raise CommandError(f"Could not load scorer: {e}")
+
+        collection = MongoDB().get_collection('transactions')
+        if collection is None:
+            raise CommandError("Could not access transactions collection")
+
+        base_conditions = [{"status": {"$nin": [*IN_PROGRESS_STATUSES, "Failed"]}}]
+        if options['since']:
+            base_conditions.append({"timestamp": {"$gte": options['since']}})
+
+        self.baseline_stats = ScorerStats(options['baseline'])
+        self.candidate_stats = ScorerStats(options['candidate'])
+        self.flips = Counter()
+        self.replayed = 0
+        self.delta_total = 0.0
+        self.abs_delta_total = 0.0
+        self.max_abs_delta = 0.0
+
+        started = time.perf_counter()
+        with ThreadPoolExecutor(max_workers=options['workers']) as executor:
+            last = None
+            remaining = options['limit'] or None
+            while remaining is None or remaining > 0:
+                batch_size = options['batch_size'] if remaining is None else min(options['batch_size'], remaining)
+                batch = self._next_batch(collection, base_conditions, last, batch_size)
+                if not batch:
+                    break
+                self._replay_batch(executor, baseline, candidate, batch)
+                last = batch[-1]
+                if remaining is not None:
+                    remaining -= len(batch)
+        elapsed = time.perf_counter() - started
+
+        self._report(elapsed, options['workers'])
+
+    def _next_batch(self, collection, base_conditions, last, batch_size):
+        """
+        Read the next batch in (timestamp, id) order with its own short query.
+        Scoring a batch can take longer than the server's idle cursor timeout,
+        so no cursor is held open between batches.
+        """
+        conditions = list(base_conditions)
+        if last is not None:
+            # The plain $gte keeps the index bounds tight; the $or breaks ties on id
+            conditions.append({"timestamp": {"$gte": last["timestamp"]}})
+            conditions.append({"$or": [
+                {"timestamp": {"$gt": last["timestamp"]}},
+                {"timestamp": last["timestamp"], "id": {"$gt": last["id"]}},
+            ]})
+        return list(
+            collection.find({"$and": conditions}, REPLAY_FIELDS)
+            .sort([("timestamp", 1), ("id", 1)])
+            .hint('timestamp_id')
+            .limit(batch_size)
+        )
+
+    def _replay_batch(self, executor, baseline, candidate, batch):
+        # Collect results on this thread so the running totals need no locking
+        for result in executor.map(lambda t: self._replay_one(baseline, candidate, t), batch):
+            base, cand = result
+            if base is None or cand is None:
+                self.baseline_stats.errors += base is None
+                self.candidate_stats.errors += cand is None
+                continue
+            base_score, base_status, base_ms = base
+            cand_score, cand_status, cand_ms = cand
+            self.baseline_stats.add(base_status, base_ms)
+            self.candidate_stats.add(cand_status, cand_ms)
+            delta = cand_score - base_score
+            self.delta_total += delta
+            self.abs_delta_total += abs(delta)
+            self.max_abs_delta = max(self.max_abs_delta, abs(delta))
+            if base_status != cand_status:
+                self.flips[(base_status, cand_status)] += 1
+            self.replayed += 1
+        self.stdout.write(f"Replayed {self.replayed} transactions...")
+
+    def _replay_one(self, baseline, candidate, transaction):
+        """Run both scorers on one transaction; a failed scorer's result is None."""
+        results = []
+        for label, scorer in (("Baseline", baseline), ("Candidate", candidate)):
+            try:
+                results.append(run_scorer(scorer, transaction))
+            except Exception as e:
+                self.stderr.write(f"{label} scorer failed on {transaction['id']}: {e}")
+                results.append(None)
+        return results
+
+    def _report(self, elapsed, workers):
+        self.stdout.write("")
+        self.stdout.write(f"Replayed {self.replayed} transactions in {elapsed:.1f}s "
+                          f"({self.replayed / elapsed if elapsed else 0:.1f}/s overall)")
+        if not self.replayed:
+            return
+
+        for stats in (self.baseline_stats, self.candidate_stats):
+            mean_ms = stats.total_ms / stats.calls if stats.calls else 0
+            # Scorer-only throughput: calls per second of scoring time across all workers
+            throughput = stats.calls * workers / (stats.total_ms / 1000) if stats.total_ms else 0
+            self.stdout.write("")
+            self.stdout.write(f"{stats.name}")
+            self.stdout.write(f"  calls: {stats.calls}, errors: {stats.errors}")
+            self.stdout.write(f"  latency: mean {mean_ms:.1f}ms, max {stats.max_ms:.1f}ms")
+            self.stdout.write(f"  throughput: {throughput:.1f}/s")
+            self.stdout.write(f"  statuses: {dict(stats.statuses)}")
+
+        flipped = sum(self.flips.values())
+        self.stdout.write("")
+        self.stdout.write(f"Score delta (candidate - baseline): mean {self.delta_total / self.replayed:+.3f}, "
+                          f"mean absolute {self.abs_delta_total / self.replayed:.3f}, "
+                          f"max absolute {self.max_abs_delta:.3f}")
+        self.stdout.write(f"Status flips: {flipped} ({flipped / self.replayed:.1%})")
+        for (base_status, cand_status), count in self.flips.most_common():
+            self.stdout.write(f"  {base_status} -> {cand_status}: {count}")
@@ -1,9 +1,33 @@
-from pymongo import MongoClient, errors
+from pymongo import MongoClient, ASCENDING, DESCENDING, errors
 from django.conf import settings
 import logging
 
 logger = logging.getLogger(__name__)
 
+# Indexes created the first time a collection is accessed in this process
+COLLECTION_INDEXES = {
+    'transactions': [
+        ([('id', ASCENDING)], {'unique': True}),
+        ([('status', ASCENDING), ('lease_expires', ASCENDING)], {}),
+        # Keyset pagination for GET /api/transactions, newest first
+        ([('timestamp', DESCENDING), ('id', DESCENDING)], {'name': 'timestamp_id'}),
+        ([('sender', ASCENDING), ('timestamp', DESCENDING), ('id', DESCENDING)], {'name': 'sender_timestamp_id'}),
+        ([('receiver', ASCENDING), ('timestamp', DESCENDING), ('id', DESCENDING)], {'name': 'receiver_timestamp_id'}),
+        ([('status', ASCENDING), ('timestamp', DESCENDING), ('id', DESCENDING)], {'name': 'status_timestamp_id'}),
+    ],
+    'transaction_stats': [
+        ([('hour', ASCENDING), ('status', ASCENDING)], {'unique': True}),
+    ],
+    'transaction_party_stats': [
+        ([('role', ASCENDING), ('hour', ASCENDING), ('address', ASCENDING)], {'unique': True}),
+    ],
+    'transaction_party_top': [
+        ([('role', ASCENDING), ('hour', ASCENDING)], {'unique': True}),
+    ],
+}
+
+_indexed_collections = set()
+
 class MongoDB:
     def __init__(self):
         self.client = None
@@ -35,11 +59,23 @@ class MongoDB:
                 # Create the collection
                 self.db.create_collection(collection_name)
                 logger.info(f"Created collection: {collection_name}")
+            self._ensure_indexes(collection_name, collection)
             return collection
         except Exception as e:
             logger.error(f"Error accessing collection {collection_name}: {e}")
             return None
 
+    def _ensure_indexes(self, collection_name, collection):
+        """Create the indexes registered for a collection, once per process."""
+        if collection_name in _indexed_collections:
+            return
+        for keys, options in COLLECTION_INDEXES.get(collection_name, []):
+            try:
+                collection.create_index(keys, **options)
+            except Exception as e:
+                logger.error(f"Error creating index {keys} on {collection_name}: {e}")
+        _indexed_collections.add(collection_name)
+
     def is_connected(self):
         """Check if MongoDB is connected."""
         try:
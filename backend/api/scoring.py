@@ -0,0 +1,58 @@
+import logging
+from typing import Dict, Any, Optional
+from .gemini_service import analyze_transaction, score_to_status
+from .job_state import public_document
+from .events import get_broker
+from .health import get_health_monitor
+from .shadow import get_shadow_scorer
+from .stats import record_transaction
+
+logger = logging.getLogger(__name__)
+
+def score_transaction(
+    sender: str,
+    receiver: str,
+    amount: float,
+    description: Optional[str] = None
+) -> Dict[str, Any]:
+    """
+    Analyze a transaction and return the result fields stored on its document.
+    """
+    analysis_result = analyze_transaction(
+        sender=sender,
+        receiver=receiver,
+        amount=amount,
+        description=description
+    )
+    return {
+        "status": score_to_status(analysis_result["score"]),
+        "score": analysis_result["score"],
+        "explanation": analysis_result.get("explanation", ""),
+        "risk_factors": analysis_result.get("risk_factors", [])
+    }
+
+def transaction_stored(transaction: Dict[str, Any]) -> None:
+    """
+    Called once a transaction's final result has been written to MongoDB.
+    """
+    get_health_monitor().record_write()
+    document = public_document(transaction)
+
+    try:
+        get_broker().publish(document)
+    except Exception as e:
+        logger.error(f"Error publishing transaction {transaction.get('id')}: {e}")
+
+    if transaction.get("score") is None:
+        return
+    try:
+        record_transaction(document)
+    except Exception as e:
+        logger.error(f"Error updating stats for transaction {transaction.get('id')}: {e}")
+
+    try:
+        shadow_scorer = get_shadow_scorer()
+        if shadow_scorer is not None:
+            shadow_scorer.maybe_submit(document)
+    except Exception as e:
+        logger.error(f"Error sampling transaction {transaction.get('id')} for shadow scoring: {e}")
@@ -16,4 +16,5 @@ class TransactionRequestSerializer(serializers.Serializer):
     sender = serializers.CharField()
     receiver = serializers.CharField()
     amount = serializers.FloatField()
-    description = serializers.CharField(required=False, allow_blank=True) 
\ No newline at end of file
+    description = serializers.CharField(required=False, allow_blank=True)
+    priority = serializers.ChoiceField(choices=['high', 'normal', 'low'], required=False, default='normal') 
\ No newline at end of file
@@ -0,0 +1,140 @@
+"""
+Shadow scoring for comparing a candidate analyzer against the live one.
+
+When ``SHADOW_SCORER`` is set, a ``SHADOW_SAMPLE_RATE`` fraction of stored
+transactions is re-scored by the candidate on a small thread pool, off the
+request path. At most ``SHADOW_MAX_PENDING`` samples are in flight at once;
+anything beyond that budget is skipped rather than queued, and the number
+skipped is reported by ``/api/health``. Each comparison is written to the
+``shadow_results`` collection.
+"""
+import logging
+import random
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor, wait
+from datetime import datetime
+from django.conf import settings
+from django.utils.module_loading import import_string
+from .gemini_service import score_to_status
+from .mongodb import MongoDB
+
+logger = logging.getLogger(__name__)
+
+
+def run_scorer(scorer, transaction):
+    """Score a transaction document and return (score, status, latency_ms)."""
+    started = time.perf_counter()
+    result = scorer(
+        sender=transaction["sender"],
+        receiver=transaction["receiver"],
+        amount=transaction["amount"],
+        description=transaction.get("description", '')
+    )
+    latency_ms = (time.perf_counter() - started) * 1000
+    return result["score"], score_to_status(result["score"]), latency_ms
+
+
+class ShadowScorer:
+    def __init__(self, scorer_path, sample_rate, max_workers, max_pending):
+        self.scorer_path = scorer_path
+        self.scorer = import_string(scorer_path)
+        self.sample_rate = sample_rate
+        self.skipped = 0
+        self._slots = threading.BoundedSemaphore(max_pending)
+        self._executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="shadow-scorer")
+        self._local = threading.local()
+        self._futures = set()
+        self._lock = threading.Lock()
+
+    def maybe_submit(self, transaction):
+        """Sample a stored transaction for shadow scoring. Never blocks."""
+        if random.random() >= self.sample_rate:
+            return False
+        if not self._slots.acquire(blocking=False):
+            with self._lock:
+                self.skipped += 1
+            return False
+        future = self._executor.submit(self._score, transaction)
+        with self._lock:
+            self._futures.add(future)
+        future.add_done_callback(self._finished)
+        return True
+
+    def status(self):
+        """Sampling counters for /api/health."""
+        with self._lock:
+            return {
+                "scorer": self.scorer_path,
+                "sample_rate": self.sample_rate,
+                "in_flight": len(self._futures),
+                "skipped": self.skipped,
+            }
+
+    def shutdown(self, timeout=None):
+        """
+        Drop samples that have not started and wait up to ``timeout`` seconds
+        for the ones in flight. Shadow results are best-effort.
+        """
+        self._executor.shutdown(wait=False, cancel_futures=True)
+        with self._lock:
+            in_flight = list(self._futures)
+        wait(in_flight, timeout=timeout)
+
+    def _finished(self, future):
+        with self._lock:
+            self._futures.discard(future)
+        self._slots.release()
+
+    def _score(self, transaction):
+        try:
+            score, status, latency_ms = run_scorer(self.scorer, transaction)
+            record = {
+                "id": transaction["id"],
+                "scorer": self.scorer_path,
+                "live_score": transaction["score"],
+                "live_status": transaction["status"],
+                "shadow_score": score,
+                "shadow_status": status,
+                "score_delta": score - transaction["score"],
+                "status_flip": status != transaction["status"],
+                "latency_ms": round(latency_ms, 2),
+                "timestamp": datetime.now().isoformat()
+            }
+            collection = self._collection()
+            if collection is None:
+                logger.error("Could not access shadow_results collection")
+                return
+            collection.insert_one(record)
+        except Exception as e:
+            logger.error(f"Shadow scoring failed for transaction {transaction['id']}: {e}")
+
+    def _collection(self):
+        # One MongoDB connection per shadow worker thread
+        mongo_db = getattr(self._local, 'mongo_db', None)
+        if mongo_db is None or mongo_db.db is None:
+            mongo_db = self._local.mongo_db = MongoDB()
+        return mongo_db.get_collection('shadow_results')
+
+
+_shadow_scorer = None
+_shadow_scorer_lock = threading.Lock()
+
+def get_shadow_scorer():
+    """Return the process-wide shadow scorer, or None if shadow mode is off."""
+    global _shadow_scorer
+    if not settings.SHADOW_SCORER:
+        return None
+    with _shadow_scorer_lock:
+        if _shadow_scorer is None:
+            _shadow_scorer = ShadowScorer(
+                scorer_path=settings.SHADOW_SCORER,
+                sample_rate=settings.SHADOW_SAMPLE_RATE,
+                max_workers=settings.SHADOW_MAX_WORKERS,
+                max_pending=settings.SHADOW_MAX_PENDING
+            )
+    return _shadow_scorer
+
+def current_shadow_scorer():
+    """Return the shadow scorer if this process has started one, else None."""
+    return _shadow_scorer
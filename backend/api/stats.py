@@ -0,0 +1,196 @@
+"""
+Hourly rollups of transaction results.
+
+Every stored result increments counters in two small collections, so
+dashboards never have to scan ``transactions``:
+
+- ``transaction_stats``: one document per (hour, status) with the count,
+  amount total and a histogram of scores in ``SCORE_BUCKETS`` buckets.
+- ``transaction_party_stats``: one document per (role, hour, address) with
+  the count and amount total, used for top senders and receivers.
+- ``transaction_party_top``: one document per (role, hour) holding that
+  hour's top ``STATS_PARTY_TOP_K`` addresses.
+
+Per-address counters are only kept for recent hours: ``manage.py
+compact_stats`` folds each older hour into its top list and deletes them,
+so the party collections stay bounded by ``STATS_PARTY_LIVE_HOURS`` of
+addresses plus ``STATS_PARTY_TOP_K`` entries per hour. Top senders and
+receivers over a range are merged from those per-hour lists, which makes
+them approximate for addresses that never reach an hour's top list.
+
+``manage.py rebuild_stats`` recomputes everything from the raw documents in
+``transactions`` and in the local archive (see ``archive.py``).
+"""
+import logging
+import threading
+from collections import defaultdict
+from django.conf import settings
+from pymongo import UpdateOne, DESCENDING
+from .mongodb import MongoDB
+
+logger = logging.getLogger(__name__)
+
+STATS_COLLECTION = 'transaction_stats'
+PARTY_STATS_COLLECTION = 'transaction_party_stats'
+PARTY_TOP_COLLECTION = 'transaction_party_top'
+SCORE_BUCKETS = 10
+
+# Fields of a transaction document the rollups are built from
+ROLLUP_FIELDS = {"_id": 0, "sender": 1, "receiver": 1, "amount": 1,
+                 "status": 1, "score": 1, "timestamp": 1}
+
+
+def hour_of(timestamp):
+    """Bucket key for an ISO timestamp, e.g. '2024-03-01T14'."""
+    return timestamp[:13]
+
+def score_bucket(score):
+    return min(int(score * SCORE_BUCKETS), SCORE_BUCKETS - 1)
+
+
+class RollupBatch:
+    """Accumulates rollup increments so many transactions cost one bulk write."""
+
+    def __init__(self):
+        self.stats = defaultdict(lambda: defaultdict(int))
+        self.parties = defaultdict(lambda: defaultdict(int))
+
+    def add(self, transaction):
+        hour = hour_of(transaction["timestamp"])
+        amount = transaction["amount"]
+
+        counters = self.stats[(hour, transaction["status"])]
+        counters["count"] += 1
+        counters["amount_total"] += amount
+        counters[f"score_hist.{score_bucket(transaction['score'])}"] += 1
+
+        for role in ("sender", "receiver"):
+            counters = self.parties[(role, hour, transaction[role])]
+            counters["count"] += 1
+            counters["amount_total"] += amount
+
+    def write(self, db):
+        """Apply the accumulated increments to a pymongo database and reset."""
+        stats_ops = [
+            UpdateOne({"hour": hour, "status": status}, {"$inc": dict(counters)}, upsert=True)
+            for (hour, status), counters in self.stats.items()
+        ]
+        party_ops = [
+            UpdateOne({"role": role, "hour": hour, "address": address}, {"$inc": dict(counters)}, upsert=True)
+            for (role, hour, address), counters in self.parties.items()
+        ]
+        if stats_ops:
+            db[STATS_COLLECTION].bulk_write(stats_ops, ordered=False)
+        if party_ops:
+            db[PARTY_STATS_COLLECTION].bulk_write(party_ops, ordered=False)
+        self.stats.clear()
+        self.parties.clear()
+
+
+_mongo_db = None
+_mongo_db_lock = threading.Lock()
+
+def _get_db():
+    # One shared connection for rollup writes; MongoClient is thread-safe
+    global _mongo_db
+    with _mongo_db_lock:
+        if _mongo_db is None or _mongo_db.db is None:
+            _mongo_db = MongoDB()
+            # Create the rollup collections and their indexes up front
+            for collection_name in (STATS_COLLECTION, PARTY_STATS_COLLECTION):
+                if _mongo_db.get_collection(collection_name) is None:
+                    raise RuntimeError(f"Could not access {collection_name} collection")
+        return _mongo_db.db
+
+def record_transaction(transaction):
+    """Add one stored result to the rollups."""
+    batch = RollupBatch()
+    batch.add(transaction)
+    batch.write(_get_db())
+
+
+def query_stats(mongo_db, start_hour, end_hour, top):
+    """Read dashboard statistics for hours in [start_hour, end_hour] from the rollups."""
+    hour_range = {"$gte": start_hour, "$lte": end_hour}
+
+    hourly = []
+    by_status = defaultdict(lambda: {"count": 0, "amount_total": 0.0})
+    score_hist = [0] * SCORE_BUCKETS
+    stats = mongo_db.get_collection(STATS_COLLECTION)
+    for doc in stats.find({"hour": hour_range}, {"_id": 0}).sort("hour", 1):
+        count = int(doc.get("count", 0))
+        amount_total = doc.get("amount_total", 0.0)
+        hourly.append({"hour": doc["hour"], "status": doc["status"],
+                       "count": count, "amount_total": amount_total})
+        by_status[doc["status"]]["count"] += count
+        by_status[doc["status"]]["amount_total"] += amount_total
+        for bucket, bucket_count in doc.get("score_hist", {}).items():
+            score_hist[int(bucket)] += int(bucket_count)
+
+    parties = mongo_db.get_collection(PARTY_STATS_COLLECTION)
+    tops = mongo_db.get_collection(PARTY_TOP_COLLECTION)
+    top_parties = {}
+    for role in ("sender", "receiver"):
+        # Compacted hours contribute their top lists, recent hours their counters
+        entries = [
+            entry
+            for doc in tops.find({"role": role, "hour": hour_range}, {"_id": 0, "top": 1})
+            for entry in doc["top"]
+        ]
+        pipeline = [
+            {"$match": {"role": role, "hour": hour_range}},
+            {"$group": {"_id": "$address", "count": {"$sum": "$count"}, "amount_total": {"$sum": "$amount_total"}}},
+            {"$sort": {"count": DESCENDING, "amount_total": DESCENDING}},
+            {"$limit": settings.STATS_PARTY_TOP_K},
+            {"$project": {"_id": 0, "address": "$_id", "count": 1, "amount_total": 1}},
+        ]
+        entries.extend(parties.aggregate(pipeline, allowDiskUse=True))
+        top_parties[role] = merge_top(entries, top)
+
+    return {
+        "hourly": hourly,
+        "by_status": dict(by_status),
+        "score_distribution": [
+            {"range": f"{i / SCORE_BUCKETS:.1f}-{(i + 1) / SCORE_BUCKETS:.1f}", "count": count}
+            for i, count in enumerate(score_hist)
+        ],
+        "top_senders": top_parties["sender"],
+        "top_receivers": top_parties["receiver"],
+    }
+
+
+def merge_top(entries, k):
+    """Sum {address, count, amount_total} entries per address and keep the k largest."""
+    totals = defaultdict(lambda: {"count": 0, "amount_total": 0})
+    for entry in entries:
+        total = totals[entry["address"]]
+        total["count"] += int(entry["count"])
+        total["amount_total"] += entry["amount_total"]
+    ranked = sorted(totals.items(), key=lambda item: (item[1]["count"], item[1]["amount_total"]), reverse=True)
+    return [{"address": address, **total} for address, total in ranked[:k]]
+
+def compact_party_stats(db, before_hour, top_k):
+    """
+    Fold the per-address counters of every hour before ``before_hour`` into
+    that hour's top ``top_k`` list in a pymongo database and delete them.
+    Returns the number of (role, hour) lists written.
+    """
+    parties = db[PARTY_STATS_COLLECTION]
+    tops = db[PARTY_TOP_COLLECTION]
+    compacted = 0
+    for role in ("sender", "receiver"):
+        for hour in sorted(parties.distinct("hour", {"role": role, "hour": {"$lt": before_hour}})):
+            key = {"role": role, "hour": hour}
+            hour_top = parties.aggregate([
+                {"$match": key},
+                {"$sort": {"count": DESCENDING, "amount_total": DESCENDING}},
+                {"$limit": top_k},
+                {"$project": {"_id": 0, "address": 1, "count": 1, "amount_total": 1}},
+            ], allowDiskUse=True)
+            # Results stored late for an already compacted hour are merged in
+            existing = tops.find_one(key, {"_id": 0, "top": 1}) or {}
+            tops.update_one(key, {"$set": {"top": merge_top([*existing.get("top", []), *hour_top], top_k)}},
+                            upsert=True)
+            parties.delete_many(key)
+            compacted += 1
+    return compacted
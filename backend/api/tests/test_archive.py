@@ -0,0 +1,44 @@
+import tempfile
+from django.test import SimpleTestCase
+from api.archive import TransactionArchive
+
+
+class TransactionArchiveTests(SimpleTestCase):
+    def setUp(self):
+        directory = tempfile.TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+        self.archive = TransactionArchive(directory.name)
+
+    def test_lookup_across_members(self):
+        self.archive.write_batch([
+            {"id": "a", "timestamp": "2024-03-01T10:00:00", "status": "Clear", "score": 0.1},
+            {"id": "b", "timestamp": "2024-03-02T10:00:00", "status": "Suspicious", "score": 0.6},
+        ])
+        self.archive.write_batch([
+            {"id": "c", "timestamp": "2024-03-01T11:00:00", "status": "Fraudulent", "score": 0.9},
+            {"id": "a", "timestamp": "2024-03-01T10:00:00", "status": "Suspicious", "score": 0.7},
+        ])
+
+        self.assertEqual(self.archive.lookup("b")["status"], "Suspicious")
+        self.assertEqual(self.archive.lookup("c")["score"], 0.9)
+        # The latest copy wins
+        self.assertEqual(self.archive.lookup("a")["score"], 0.7)
+        self.assertIsNone(self.archive.lookup("missing"))
+
+    def test_archived_ids(self):
+        self.archive.write_batch([{"id": f"t{i}", "timestamp": "2024-03-01T10:00:00"} for i in range(600)])
+        self.assertEqual(self.archive.archived_ids(["t1", "t599", "missing"]), {"t1", "t599"})
+
+    def test_iter_yields_each_id_once(self):
+        self.archive.write_batch([
+            {"id": "a", "timestamp": "2024-03-01T10:00:00", "score": 0.1},
+            {"id": "b", "timestamp": "2024-03-02T10:00:00", "score": 0.2},
+        ])
+        self.archive.write_batch([{"id": "a", "timestamp": "2024-03-01T10:00:00", "score": 0.4}])
+        self.assertEqual(sorted((t["id"], t["score"]) for t in self.archive.iter_transactions()),
+                         [("a", 0.4), ("b", 0.2)])
+
+    def test_empty_archive(self):
+        self.assertIsNone(self.archive.lookup("a"))
+        self.assertEqual(self.archive.archived_ids(["a"]), set())
+        self.assertEqual(list(self.archive.iter_transactions()), [])
@@ -0,0 +1,91 @@
+import asyncio
+import json
+import threading
+from unittest import mock
+from django.test import SimpleTestCase, override_settings
+from api import events
+from api.events import TransactionBroker
+from api.views import _transaction_event_stream
+
+
+class TransactionBrokerTests(SimpleTestCase):
+    def test_fan_out_from_another_thread(self):
+        broker = TransactionBroker()
+
+        async def scenario():
+            first = broker.subscribe(["t1", "t2"])
+            second = broker.subscribe(["t1"])
+            thread = threading.Thread(target=broker.publish, args=({"id": "t1", "status": "Clear"},))
+            thread.start()
+            thread.join()
+            received = [await asyncio.wait_for(queue.get(), 1) for queue in (first, second)]
+
+            broker.unsubscribe(["t1", "t2"], first)
+            broker.publish({"id": "t1", "status": "Clear"})
+            await asyncio.wait_for(second.get(), 1)
+            return received, first.empty()
+
+        received, first_empty = asyncio.run(scenario())
+        self.assertEqual([t["id"] for t in received], ["t1", "t1"])
+        self.assertTrue(first_empty)
+        self.assertEqual(broker._subscribers.keys(), {"t1"})
+
+    def test_publish_without_subscribers(self):
+        TransactionBroker().publish({"id": "t1", "status": "Clear"})
+
+
+@override_settings(EVENTS_STREAM_TIMEOUT=0.3, EVENTS_KEEPALIVE_SECONDS=0.1, EVENTS_CHANGE_STREAM=False)
+class TransactionEventStreamTests(SimpleTestCase):
+    def setUp(self):
+        self.broker = TransactionBroker()
+        patcher = mock.patch('api.views.get_broker', return_value=self.broker)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+        self.stored = []
+
+        async def find_completed(transaction_ids):
+            return [t for t in self.stored if t["id"] in transaction_ids]
+
+        patcher = mock.patch('api.views._find_completed_transactions_async', side_effect=find_completed)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def _collect(self, transaction_ids, publish=None):
+        async def scenario():
+            chunks = []
+            async for chunk in _transaction_event_stream(transaction_ids):
+                chunks.append(chunk)
+                if publish and len(chunks) == 1:
+                    self.broker.publish(publish)
+            return chunks
+        return asyncio.run(scenario())
+
+    def test_times_out_with_pending_ids(self):
+        chunks = self._collect(["t1", "t2"])
+        self.assertIn(": keepalive\n\n", chunks)
+        self.assertTrue(chunks[-1].startswith("event: timeout\n"))
+        data = json.loads(chunks[-1].split("data: ", 1)[1])
+        self.assertEqual(data, {"pending": ["t1", "t2"]})
+
+    def test_already_stored_and_published(self):
+        self.stored.append({"id": "t1", "status": "Clear"})
+        chunks = self._collect(["t1", "t2"], publish={"id": "t2", "status": "Fraudulent"})
+        events_sent = [c for c in chunks if c.startswith("event: transaction")]
+        self.assertEqual(len(events_sent), 2)
+        self.assertIn('"Fraudulent"', events_sent[1])
+        self.assertFalse(any(c.startswith("event: timeout") for c in chunks))
+        self.assertEqual(self.broker._subscribers, {})
+
+
+class FindCompletedTransactionsTests(SimpleTestCase):
+    def test_reuses_one_client(self):
+        mongo_db = mock.MagicMock()
+        self.addCleanup(setattr, events, '_mongo_db', None)
+        events._mongo_db = None
+        with mock.patch('api.events.MongoDB', return_value=mongo_db) as mongo_class:
+            for _ in range(3):
+                events.find_completed_transactions(["t1"])
+        mongo_class.assert_called_once()
+        query, projection = mongo_db.db['transactions'].find.call_args.args
+        self.assertEqual(query["status"], {"$nin": ["Pending", "Scoring"]})
+        self.assertEqual(projection["owner"], 0)
@@ -0,0 +1,60 @@
+import threading
+from unittest import mock
+from django.test import SimpleTestCase
+from api.health import HealthMonitor
+from api.views import _health_status
+
+
+class HealthMonitorTests(SimpleTestCase):
+    def setUp(self):
+        self.monitor = HealthMonitor(interval=60, history_size=3)
+        self.addCleanup(self.monitor.stop, timeout=1)
+
+    def test_starting_until_first_probe(self):
+        state = self.monitor.snapshot()
+        self.assertEqual(state["state"], "starting")
+        self.assertIsNone(state["last_probe"])
+        self.assertEqual(_health_status(state, True), "starting")
+
+    def test_start_does_not_block_on_probe(self):
+        release = threading.Event()
+        probed = threading.Event()
+
+        def slow_probe():
+            probed.set()
+            release.wait(5)
+
+        with mock.patch.object(self.monitor, 'probe', side_effect=slow_probe):
+            self.monitor.start()
+            # start() returned while the first probe is still running
+            self.assertTrue(probed.wait(5))
+            self.assertEqual(self.monitor.snapshot()["state"], "starting")
+            release.set()
+
+    def test_probe_up(self):
+        mongo_db = mock.Mock()
+        mongo_db.client.admin.command.return_value = {"ok": 1}
+        mongo_db.db.list_collection_names.return_value = ["transactions"]
+        with mock.patch('api.health.MongoDB', return_value=mongo_db):
+            for _ in range(4):
+                self.monitor.probe()
+        state = self.monitor.snapshot()
+        self.assertEqual(state["state"], "up")
+        self.assertTrue(state["collection_available"])
+        self.assertEqual(len(state["latency_history_ms"]), 3)
+        self.assertEqual(_health_status(state, True), "healthy")
+
+    def test_probe_down(self):
+        mongo_db = mock.Mock(client=None)
+        with mock.patch('api.health.MongoDB', return_value=mongo_db):
+            self.monitor.probe()
+        state = self.monitor.snapshot()
+        self.assertEqual(state["state"], "down")
+        self.assertEqual(state["last_error"], "MongoDB connection failed")
+        self.assertIsNotNone(state["last_probe"])
+        self.assertEqual(_health_status(state, True), "degraded")
+
+    def test_record_write(self):
+        self.assertIsNone(self.monitor.snapshot()["last_successful_write"])
+        self.monitor.record_write()
+        self.assertIsNotNone(self.monitor.snapshot()["last_successful_write"])
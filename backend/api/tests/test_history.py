@@ -0,0 +1,41 @@
+from django.test import SimpleTestCase
+from api.history import InvalidListQuery, build_list_query, decode_cursor, encode_cursor
+
+
+class ListQueryTests(SimpleTestCase):
+    def test_cursor_round_trip(self):
+        cursor = encode_cursor({"timestamp": "2024-03-01T14:00:00", "id": "abc"})
+        self.assertEqual(decode_cursor(cursor), ("2024-03-01T14:00:00", "abc"))
+
+    def test_bad_cursor(self):
+        with self.assertRaises(InvalidListQuery):
+            decode_cursor("not-a-cursor")
+
+    def test_bad_time(self):
+        with self.assertRaises(InvalidListQuery):
+            build_list_query({"since": "yesterday"})
+
+    def test_no_filters(self):
+        self.assertEqual(build_list_query({}), ({}, "timestamp_id"))
+
+    def test_filter_picks_index(self):
+        query, index_name = build_list_query({"receiver": "bob", "status": "Suspicious"})
+        self.assertEqual(query, {"$and": [{"receiver": "bob"}, {"status": "Suspicious"}]})
+        self.assertEqual(index_name, "receiver_timestamp_id")
+
+    def test_time_range(self):
+        query, index_name = build_list_query({"status": "Clear", "since": "2024-03-01", "until": "2024-03-02T12:00"})
+        self.assertEqual(query, {"$and": [
+            {"status": "Clear"},
+            {"timestamp": {"$gte": "2024-03-01T00:00:00", "$lt": "2024-03-02T12:00:00"}},
+        ]})
+        self.assertEqual(index_name, "status_timestamp_id")
+
+    def test_cursor_bounds_timestamp(self):
+        cursor = encode_cursor({"timestamp": "2024-03-01T14:00:00", "id": "abc"})
+        query, _ = build_list_query({"cursor": cursor})
+        self.assertEqual(query["$and"][0], {"timestamp": {"$lte": "2024-03-01T14:00:00"}})
+        self.assertEqual(query["$and"][1], {"$or": [
+            {"timestamp": {"$lt": "2024-03-01T14:00:00"}},
+            {"timestamp": "2024-03-01T14:00:00", "id": {"$lt": "abc"}},
+        ]})
@@ -0,0 +1,145 @@
+import threading
+from datetime import timedelta
+from types import SimpleNamespace
+from unittest import mock
+from django.test import SimpleTestCase
+from api.job_state import public_document
+from api.jobs import ScoringJobQueue
+
+
+class FakeCollection:
+    """Just enough of a pymongo collection for the scoring job claim and write."""
+
+    def __init__(self, docs):
+        self.docs = docs
+        self._lock = threading.Lock()
+
+    def _matches(self, doc, query):
+        for field, condition in query.items():
+            if isinstance(condition, dict) and "$in" in condition:
+                if doc.get(field) not in condition["$in"]:
+                    return False
+            elif doc.get(field) != condition:
+                return False
+        return True
+
+    def _apply(self, doc, update):
+        doc.update(update.get("$set", {}))
+        for field in update.get("$unset", {}):
+            doc.pop(field, None)
+
+    def find_one_and_update(self, query, update):
+        with self._lock:
+            for doc in self.docs:
+                if self._matches(doc, query):
+                    before = dict(doc)
+                    self._apply(doc, update)
+                    return before
+        return None
+
+    def update_one(self, query, update):
+        with self._lock:
+            for doc in self.docs:
+                if self._matches(doc, query):
+                    self._apply(doc, update)
+                    return SimpleNamespace(matched_count=1)
+        return SimpleNamespace(matched_count=0)
+
+
+RESULT = {"status": "Clear", "score": 0.1, "explanation": "", "risk_factors": []}
+
+
+class ScoringJobQueueTests(SimpleTestCase):
+    def setUp(self):
+        self.queue = ScoringJobQueue(workers=1, max_size=10, max_retries=0, retry_delay=0, lease_seconds=60)
+        self.transaction = {"id": "t1", "sender": "alice", "receiver": "bob", "amount": 10}
+        self.collection = FakeCollection([{
+            **self.transaction, "status": "Pending", "priority": "normal", **self.queue.lease()
+        }])
+        self.mongo_db = SimpleNamespace(get_collection=lambda name: self.collection)
+
+    def _process_twice(self):
+        with mock.patch('api.jobs.score_transaction', return_value=dict(RESULT)) as score, \
+                mock.patch('api.jobs.transaction_stored') as stored:
+            threads = [threading.Thread(target=self.queue._process, args=(self.mongo_db, self.transaction))
+                       for _ in range(2)]
+            for thread in threads:
+                thread.start()
+            for thread in threads:
+                thread.join()
+        return score, stored
+
+    def test_scored_once(self):
+        score, stored = self._process_twice()
+        self.assertEqual(score.call_count, 1)
+        self.assertEqual(stored.call_count, 1)
+        self.assertEqual(self.collection.docs[0]["status"], "Clear")
+
+    def test_bookkeeping_removed(self):
+        self._process_twice()
+        document = self.collection.docs[0]
+        for field in ("owner", "lease_expires", "claimed_at", "priority"):
+            self.assertNotIn(field, document)
+
+    def test_other_owner_not_scored(self):
+        self.collection.docs[0]["owner"] = "another-process"
+        score, stored = self._process_twice()
+        score.assert_not_called()
+        stored.assert_not_called()
+        self.assertEqual(self.collection.docs[0]["status"], "Pending")
+
+    def test_lost_lease_discards_result(self):
+        def recovered_elsewhere(**kwargs):
+            self.collection.docs[0].update(status="Pending", owner="another-process")
+            return dict(RESULT)
+
+        with mock.patch('api.jobs.score_transaction', side_effect=recovered_elsewhere), \
+                mock.patch('api.jobs.transaction_stored') as stored:
+            self.queue._process(self.mongo_db, self.transaction)
+        stored.assert_not_called()
+        self.assertEqual(self.collection.docs[0]["status"], "Pending")
+
+    def test_failed_job_released(self):
+        self.collection.docs[0]["status"] = "Scoring"
+        with mock.patch('api.jobs.MongoDB', return_value=self.mongo_db), \
+                mock.patch('api.jobs.transaction_stored') as stored:
+            self.queue._retry_or_fail(1, 0, self.transaction, RuntimeError("model down"))
+        document = self.collection.docs[0]
+        self.assertEqual(document["status"], "Failed")
+        self.assertNotIn("owner", document)
+        stored.assert_called_once()
+
+
+class LeaseTests(SimpleTestCase):
+    def setUp(self):
+        self.queue = ScoringJobQueue(workers=1, max_size=10, max_retries=0, retry_delay=0, lease_seconds=60)
+        self.collection = mock.Mock()
+        self.mongo_db = SimpleNamespace(get_collection=lambda name: self.collection)
+
+    def test_lease_is_utc(self):
+        lease = self.queue.lease()
+        self.assertEqual(lease["owner"], self.queue.owner)
+        self.assertEqual(lease["lease_expires"].utcoffset(), timedelta(0))
+
+    def test_renewal_uses_server_clock(self):
+        self.queue._owned.add("t1")
+        with mock.patch('api.jobs.MongoDB', return_value=self.mongo_db):
+            self.queue.renew_leases()
+        query, update = self.collection.update_many.call_args.args
+        self.assertEqual(query["owner"], self.queue.owner)
+        self.assertEqual(update, [{"$set": {"owner": self.queue.owner,
+                                            "lease_expires": {"$add": ["$$NOW", 60000]}}}])
+
+    def test_recovery_compares_server_clock(self):
+        self.collection.find.return_value = []
+        with mock.patch('api.jobs.MongoDB', return_value=self.mongo_db):
+            self.assertEqual(self.queue.recover_expired_jobs(), 0)
+        query = self.collection.find.call_args.args[0]
+        self.assertEqual(query["$expr"], {"$lt": ["$lease_expires", "$$NOW"]})
+
+
+class PublicDocumentTests(SimpleTestCase):
+    def test_strips_bookkeeping(self):
+        document = public_document({"_id": 1, "id": "t1", "status": "Pending", "owner": "host:1:abc",
+                                    "lease_expires": "later", "claimed_at": "now", "priority": "high"})
+        self.assertEqual(document, {"id": "t1", "status": "Pending"})
@@ -0,0 +1,87 @@
+import signal
+import threading
+import time
+from unittest import mock
+from django.test import SimpleTestCase, override_settings
+from api import lifecycle
+from api.jobs import ScoringJobQueue
+
+
+@mock.patch('api.lifecycle.jobs.get_job_queue')
+@mock.patch('api.lifecycle.health.get_health_monitor')
+class StartBackgroundTests(SimpleTestCase):
+    @override_settings(ASYNC_SCORING=True)
+    def test_async_starts_job_queue(self, get_health_monitor, get_job_queue):
+        lifecycle.start_background()
+        get_health_monitor.assert_called_once()
+        get_job_queue.assert_called_once()
+
+    @override_settings(ASYNC_SCORING=False)
+    def test_sync_leaves_job_queue(self, get_health_monitor, get_job_queue):
+        lifecycle.start_background()
+        get_health_monitor.assert_called_once()
+        get_job_queue.assert_not_called()
+
+
+class ShutdownBudgetTests(SimpleTestCase):
+    def setUp(self):
+        lifecycle._shutdown_started = None
+        self.addCleanup(setattr, lifecycle, '_shutdown_started', None)
+
+    def test_budget_counts_from_signal(self):
+        with mock.patch('api.lifecycle.time.monotonic', side_effect=[100.0, 112.0]):
+            lifecycle.mark_shutdown_started()
+            self.assertEqual(lifecycle.remaining_budget(30, 2), 16)
+
+    def test_budget_never_negative(self):
+        with mock.patch('api.lifecycle.time.monotonic', side_effect=[100.0, 140.0]):
+            lifecycle.mark_shutdown_started()
+            self.assertEqual(lifecycle.remaining_budget(30, 2), 0)
+
+    def test_unsignalled_worker_gets_whole_budget(self):
+        self.assertEqual(lifecycle.remaining_budget(30, 2), 28)
+
+    def test_signal_watcher_chains(self):
+        previous = signal.getsignal(signal.SIGTERM)
+        self.addCleanup(signal.signal, signal.SIGTERM, previous)
+        server_handler = mock.Mock()
+        signal.signal(signal.SIGTERM, server_handler)
+        for sig in (signal.SIGINT, signal.SIGQUIT):
+            self.addCleanup(signal.signal, sig, signal.getsignal(sig))
+
+        lifecycle.watch_shutdown_signals()
+        signal.raise_signal(signal.SIGTERM)
+
+        self.assertIsNotNone(lifecycle._shutdown_started)
+        server_handler.assert_called_once()
+
+    def test_shutdown_shares_one_deadline(self):
+        job_queue = mock.Mock()
+        job_queue.shutdown.side_effect = lambda timeout: time.sleep(0.2)
+        shadow_scorer = mock.Mock()
+        monitor = mock.Mock()
+        with mock.patch('api.lifecycle.jobs.current_job_queue', return_value=job_queue), \
+                mock.patch('api.lifecycle.shadow._shadow_scorer', shadow_scorer), \
+                mock.patch('api.lifecycle.health._monitor', monitor), \
+                mock.patch('api.lifecycle.stats._mongo_db', None):
+            lifecycle.shutdown(timeout=0.5)
+
+        self.assertAlmostEqual(job_queue.shutdown.call_args.kwargs["timeout"], 0.5, delta=0.05)
+        self.assertLess(shadow_scorer.shutdown.call_args.kwargs["timeout"], 0.35)
+        self.assertLessEqual(monitor.stop.call_args.kwargs["timeout"],
+                             shadow_scorer.shutdown.call_args.kwargs["timeout"])
+
+
+class JobQueueShutdownTests(SimpleTestCase):
+    def test_joins_within_deadline(self):
+        queue = ScoringJobQueue(workers=4, max_size=10, max_retries=0, retry_delay=0, lease_seconds=60)
+        busy = threading.Event()
+        self.addCleanup(busy.set)
+        # Workers stuck scoring do not notice the stop flag
+        queue._threads = [threading.Thread(target=busy.wait, args=(10,), daemon=True) for _ in range(5)]
+        for thread in queue._threads:
+            thread.start()
+
+        started = time.monotonic()
+        queue.shutdown(timeout=0.3)
+        self.assertLess(time.monotonic() - started, 1)
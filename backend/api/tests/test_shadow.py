@@ -0,0 +1,52 @@
+import threading
+from unittest import mock
+from django.test import SimpleTestCase
+from api.shadow import ShadowScorer
+
+TRANSACTION = {"id": "t1", "sender": "alice", "receiver": "bob", "amount": 10, "description": "",
+               "status": "Clear", "score": 0.1}
+
+
+class ShadowScorerTests(SimpleTestCase):
+    def setUp(self):
+        self.release = threading.Event()
+        self.addCleanup(self.release.set)
+
+        def candidate(sender, receiver, amount, description):
+            self.release.wait(5)
+            return {"score": 0.9}
+
+        with mock.patch('api.shadow.import_string', return_value=candidate):
+            self.scorer = ShadowScorer("tests.candidate", sample_rate=1.0, max_workers=1, max_pending=2)
+        self.collection = mock.Mock()
+        patcher = mock.patch.object(self.scorer, '_collection', return_value=self.collection)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def test_budget_skips_and_reports(self):
+        submitted = [self.scorer.maybe_submit(TRANSACTION) for _ in range(5)]
+        self.assertEqual(submitted, [True, True, False, False, False])
+        self.assertEqual(self.scorer.status(), {
+            "scorer": "tests.candidate", "sample_rate": 1.0, "in_flight": 2, "skipped": 3
+        })
+
+        # The queued second sample has not started, so shutdown drops it
+        self.scorer.shutdown(timeout=0)
+        self.release.set()
+        self.scorer.shutdown(timeout=5)
+        self.assertEqual(self.scorer.status()["in_flight"], 0)
+        self.assertEqual(self.collection.insert_one.call_count, 1)
+        record = self.collection.insert_one.call_args.args[0]
+        self.assertEqual(record["shadow_status"], "Fraudulent")
+        self.assertTrue(record["status_flip"])
+
+    def test_budget_frees_slots(self):
+        self.release.set()
+        self.assertTrue(self.scorer.maybe_submit(TRANSACTION))
+        self.scorer.shutdown(timeout=5)
+        self.assertEqual(self.scorer.status()["skipped"], 0)
+
+    def test_unsampled(self):
+        self.scorer.sample_rate = 0
+        self.assertFalse(self.scorer.maybe_submit(TRANSACTION))
+        self.assertEqual(self.scorer.status()["skipped"], 0)
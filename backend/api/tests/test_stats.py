@@ -0,0 +1,73 @@
+from datetime import datetime, timedelta, timezone
+from unittest import mock
+from django.test import SimpleTestCase, override_settings
+from rest_framework.test import APIRequestFactory
+from api.stats import RollupBatch, compact_party_stats, merge_top
+from api.views import _parse_stats_time, transaction_stats
+
+
+class RollupBatchTests(SimpleTestCase):
+    def test_add(self):
+        batch = RollupBatch()
+        for score in (0.05, 0.95, 1.0):
+            batch.add({"sender": "alice", "receiver": "bob", "amount": 10, "status": "Fraudulent",
+                       "score": score, "timestamp": "2024-03-01T14:30:00"})
+        batch.add({"sender": "carol", "receiver": "bob", "amount": 5, "status": "Suspicious",
+                   "score": 0.6, "timestamp": "2024-03-01T15:00:00"})
+
+        counters = batch.stats[("2024-03-01T14", "Fraudulent")]
+        self.assertEqual(counters["count"], 3)
+        self.assertEqual(counters["amount_total"], 30)
+        self.assertEqual(counters["score_hist.0"], 1)
+        # A score of exactly 1.0 lands in the top bucket
+        self.assertEqual(counters["score_hist.9"], 2)
+        self.assertEqual(batch.stats[("2024-03-01T15", "Suspicious")]["score_hist.6"], 1)
+        self.assertEqual(batch.parties[("sender", "2024-03-01T14", "alice")]["count"], 3)
+        self.assertEqual(batch.parties[("receiver", "2024-03-01T14", "bob")]["amount_total"], 30)
+
+
+class PartyTopTests(SimpleTestCase):
+    def test_merge_top(self):
+        entries = [
+            {"address": "a", "count": 2, "amount_total": 20},
+            {"address": "b", "count": 3, "amount_total": 5},
+            {"address": "a", "count": 2, "amount_total": 1},
+            {"address": "c", "count": 1, "amount_total": 100},
+        ]
+        self.assertEqual(merge_top(entries, 2), [
+            {"address": "a", "count": 4, "amount_total": 21},
+            {"address": "b", "count": 3, "amount_total": 5},
+        ])
+
+    def test_compact_merges_and_deletes(self):
+        db = {"transaction_party_stats": mock.Mock(), "transaction_party_top": mock.Mock()}
+        parties, tops = db["transaction_party_stats"], db["transaction_party_top"]
+        parties.distinct.side_effect = lambda field, query: ["2024-03-01T14"] if query["role"] == "sender" else []
+        parties.aggregate.return_value = [{"address": "a", "count": 1, "amount_total": 10}]
+        tops.find_one.return_value = {"top": [{"address": "a", "count": 2, "amount_total": 5},
+                                              {"address": "b", "count": 1, "amount_total": 1}]}
+
+        self.assertEqual(compact_party_stats(db, "2024-03-02T00", top_k=1), 1)
+
+        key = {"role": "sender", "hour": "2024-03-01T14"}
+        tops.update_one.assert_called_once_with(
+            key, {"$set": {"top": [{"address": "a", "count": 3, "amount_total": 15}]}}, upsert=True
+        )
+        parties.delete_many.assert_called_once_with(key)
+
+
+class StatsTimeTests(SimpleTestCase):
+    def test_offset_converted_to_local(self):
+        aware = datetime(2024, 3, 1, 14, 0, tzinfo=timezone(timedelta(hours=5)))
+        parsed = _parse_stats_time(aware.isoformat())
+        self.assertIsNone(parsed.tzinfo)
+        self.assertEqual(parsed, aware.astimezone().replace(tzinfo=None))
+
+    def test_naive_unchanged(self):
+        self.assertEqual(_parse_stats_time("2024-03-01T14:00:00"), datetime(2024, 3, 1, 14))
+
+    @override_settings(STATS_MAX_HOURS=48)
+    def test_range_capped(self):
+        request = APIRequestFactory().get('/api/stats', {"start": "2024-03-01T00:00:00", "end": "2024-03-04T00:00:00"})
+        response = transaction_stats(request)
+        self.assertEqual(response.status_code, 400)
@@ -3,6 +3,9 @@ from . import views
 
 urlpatterns = [
     path('transaction', views.process_transaction, name='process_transaction'),
+    path('transactions', views.list_transactions, name='list_transactions'),
     path('status/<str:transaction_id>', views.get_transaction_status, name='get_transaction_status'),
+    path('events', views.transaction_events, name='transaction_events'),
+    path('stats', views.transaction_stats, name='transaction_stats'),
     path('health', views.health_check, name='health_check'),
 ] 
\ No newline at end of file
@@ -1,12 +1,25 @@
+import asyncio
 import uuid
-from datetime import datetime
+from datetime import datetime, timedelta
 from bson import json_util
 import json
 from rest_framework import status
 from rest_framework.decorators import api_view
 from rest_framework.response import Response
+from asgiref.sync import sync_to_async
+from django.core.handlers.asgi import ASGIRequest
+from django.http import HttpResponseNotAllowed, JsonResponse, StreamingHttpResponse
 from .mongodb import MongoDB
-from .gemini_service import analyze_transaction
+from .scoring import score_transaction, transaction_stored
+from .jobs import get_job_queue, current_job_queue
+from .job_state import PUBLIC_FIELDS, public_document
+from .events import get_broker, find_completed_transactions
+from .health import get_health_monitor
+from .shadow import current_shadow_scorer
+from .gemini_service import get_model_status
+from .stats import query_stats, hour_of
+from .archive import get_archive
+from .history import build_list_query, encode_cursor, InvalidListQuery, LIST_FIELDS, LIST_SORT
 from .serializers import TransactionSerializer, TransactionRequestSerializer
 import logging
 from django.conf import settings
@@ -27,10 +40,13 @@ def process_transaction(request):
             )
 
         transaction_id = str(uuid.uuid4())
+
+        if _use_async_scoring(request):
+            return _enqueue_transaction(transaction_id, serializer.validated_data)
         
         # Get analysis from Gemini
         try:
-            analysis_result = analyze_transaction(
+            analysis_result = score_transaction(
                 sender=serializer.validated_data['sender'],
                 receiver=serializer.validated_data['receiver'],
                 amount=serializer.validated_data['amount'],
@@ -51,10 +67,10 @@ def process_transaction(request):
             "receiver": serializer.validated_data['receiver'],
             "amount": serializer.validated_data['amount'],
             "description": serializer.validated_data.get('description', ''),
-            "status": "Clear" if analysis_result["score"] < 0.5 else "Suspicious" if analysis_result["score"] < 0.8 else "Fraudulent",
+            "status": analysis_result["status"],
             "score": analysis_result["score"],
-            "explanation": analysis_result.get("explanation", ""),
-            "risk_factors": analysis_result.get("risk_factors", []),
+            "explanation": analysis_result["explanation"],
+            "risk_factors": analysis_result["risk_factors"],
             "timestamp": datetime.now().isoformat()
         }
 
@@ -65,6 +81,7 @@ def process_transaction(request):
             if collection is not None:
                 collection.insert_one(transaction)
                 logger.info(f"Transaction {transaction_id} stored in MongoDB")
+                transaction_stored(transaction)
             else:
                 logger.error("Could not access transactions collection")
         except Exception as e:
@@ -93,6 +110,58 @@ def process_transaction(request):
             status=status.HTTP_500_INTERNAL_SERVER_ERROR
         )
 
+def _use_async_scoring(request):
+    """Async mode comes from settings unless the request asks for ?mode=sync/async."""
+    mode = request.query_params.get('mode')
+    if mode in ('async', 'sync'):
+        return mode == 'async'
+    return settings.ASYNC_SCORING
+
+def _enqueue_transaction(transaction_id, validated_data):
+    """Store a Pending transaction and hand it to the scoring workers."""
+    now = datetime.now().isoformat()
+    priority = validated_data.get('priority', 'normal')
+    job_queue = get_job_queue()
+    transaction = {
+        "id": transaction_id,
+        "sender": validated_data['sender'],
+        "receiver": validated_data['receiver'],
+        "amount": validated_data['amount'],
+        "description": validated_data.get('description', ''),
+        "status": "Pending",
+        "score": None,
+        "explanation": "",
+        "risk_factors": [],
+        "priority": priority,
+        "timestamp": now,
+        **job_queue.lease()
+    }
+
+    # The pending document is the durable copy of the job, so it must be stored
+    mongo_db = MongoDB()
+    collection = mongo_db.get_collection('transactions')
+    if collection is None:
+        logger.error("Could not access transactions collection")
+        return Response(
+            {"error": "Database connection not available"},
+            status=status.HTTP_503_SERVICE_UNAVAILABLE
+        )
+    collection.insert_one(transaction)
+
+    if not job_queue.submit(transaction, priority):
+        logger.warning(f"Scoring queue full, rejecting transaction {transaction_id}")
+        collection.delete_one({"id": transaction_id})
+        return Response(
+            {"error": "Scoring queue full", "detail": "Try again later"},
+            status=status.HTTP_503_SERVICE_UNAVAILABLE
+        )
+
+    logger.info(f"Transaction {transaction_id} queued for scoring")
+    return Response(
+        {"id": transaction_id, "status": "Pending", "timestamp": now},
+        status=status.HTTP_202_ACCEPTED
+    )
+
 @api_view(['GET'])
 def get_transaction_status(request, transaction_id):
     try:
@@ -119,7 +188,11 @@ def get_transaction_status(request, transaction_id):
         # Find the transaction
         try:
             # Use find_one with just the ID field
-            transaction = collection.find_one({"id": transaction_id})
+            transaction = collection.find_one({"id": transaction_id}, PUBLIC_FIELDS)
+
+            # Older transactions live in the local archive
+            if transaction is None:
+                transaction = get_archive().lookup(transaction_id)
             
             if transaction is None:
                 logger.warning(f"Transaction not found: {transaction_id}")
@@ -128,9 +201,8 @@ def get_transaction_status(request, transaction_id):
                     status=status.HTTP_404_NOT_FOUND
                 )
 
-            # Remove MongoDB's _id field
-            if '_id' in transaction:
-                transaction.pop('_id')
+            # Leave out MongoDB's _id and the scoring job's bookkeeping
+            transaction = public_document(transaction)
 
             logger.info(f"Successfully retrieved transaction: {transaction_id}")
             return Response(transaction)
@@ -150,28 +222,216 @@ def get_transaction_status(request, transaction_id):
         )
 
 @api_view(['GET'])
-def health_check(request):
+def list_transactions(request):
+    """
+    Transaction history, newest first. Filters: sender, receiver, status,
+    since, until. Pass the returned next_cursor as ?cursor= for the next page.
+    """
     try:
-        # Initialize MongoDB connection
+        try:
+            query, index_name = build_list_query(request.query_params)
+            limit = int(request.query_params.get('limit', settings.TRANSACTIONS_PAGE_SIZE))
+        except (InvalidListQuery, ValueError) as e:
+            return Response(
+                {"error": "Invalid query parameter", "detail": str(e)},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+        limit = max(1, min(limit, settings.TRANSACTIONS_PAGE_SIZE_MAX))
+
         mongo_db = MongoDB()
-        
-        # Test MongoDB connection and collection
-        is_db_connected = mongo_db.is_connected()
-        collection_available = mongo_db.has_collection('transactions')
-        
+        collection = mongo_db.get_collection('transactions')
+        if collection is None:
+            logger.error("Could not access transactions collection")
+            return Response(
+                {"error": "Collection not available"},
+                status=status.HTTP_503_SERVICE_UNAVAILABLE
+            )
+
+        # Fetch one extra row to know whether another page follows
+        transactions = list(
+            collection.find(query, LIST_FIELDS)
+            .sort(LIST_SORT)
+            .hint(index_name)
+            .limit(limit + 1)
+        )
+        has_more = len(transactions) > limit
+        transactions = transactions[:limit]
+
+        return Response({
+            "transactions": transactions,
+            "next_cursor": encode_cursor(transactions[-1]) if has_more else None
+        })
+
+    except Exception as e:
+        logger.error(f"Error in list_transactions: {e}", exc_info=True)
+        return Response(
+            {"error": "Server error", "detail": str(e)},
+            status=status.HTTP_500_INTERNAL_SERVER_ERROR
+        )
+
+async def transaction_events(request):
+    """
+    Server-sent events stream that pushes each transaction's final document
+    as soon as it is stored. Subscribe with ?ids=<id>[,<id>...].
+
+    Only served under ASGI: a WSGI server would have to buffer the whole
+    stream and hold a thread for it, so there the endpoint returns 501 and
+    clients fall back to polling /api/status.
+    """
+    if request.method != 'GET':
+        return HttpResponseNotAllowed(['GET'])
+    if not isinstance(request, ASGIRequest):
+        return JsonResponse(
+            {"error": "Event streams require the ASGI server", "detail": "Poll /api/status instead"},
+            status=501
+        )
+
+    transaction_ids = list(dict.fromkeys(i for i in request.GET.get('ids', '').split(',') if i))
+    if not transaction_ids:
+        return JsonResponse({"error": "No transaction ids provided"}, status=400)
+    if len(transaction_ids) > settings.EVENTS_MAX_IDS:
+        return JsonResponse(
+            {"error": f"At most {settings.EVENTS_MAX_IDS} transaction ids per subscription"},
+            status=400
+        )
+
+    response = StreamingHttpResponse(
+        _transaction_event_stream(transaction_ids),
+        content_type='text/event-stream'
+    )
+    response['Cache-Control'] = 'no-cache'
+    response['X-Accel-Buffering'] = 'no'
+    return response
+
+def _format_event(transaction):
+    return f"event: transaction\ndata: {json_util.dumps(transaction)}\n\n"
+
+# pymongo blocks, so run its reads in the thread pool without serializing them
+_find_completed_transactions_async = sync_to_async(find_completed_transactions, thread_sensitive=False)
+
+async def _transaction_event_stream(transaction_ids):
+    loop = asyncio.get_running_loop()
+    broker = get_broker()
+    # Subscribe before reading MongoDB so a result stored in between is not missed
+    queue = broker.subscribe(transaction_ids)
+    try:
+        waiting = set(transaction_ids)
+        for transaction in await _find_completed_transactions_async(waiting):
+            waiting.discard(transaction["id"])
+            yield _format_event(transaction)
+
+        deadline = loop.time() + settings.EVENTS_STREAM_TIMEOUT
+        while waiting and loop.time() < deadline:
+            try:
+                transaction = await asyncio.wait_for(
+                    queue.get(),
+                    timeout=min(settings.EVENTS_KEEPALIVE_SECONDS, deadline - loop.time())
+                )
+            except asyncio.TimeoutError:
+                # Without the change stream feed, results stored by other worker
+                # processes are only seen by an occasional check of MongoDB
+                if not settings.EVENTS_CHANGE_STREAM:
+                    for transaction in await _find_completed_transactions_async(waiting):
+                        waiting.discard(transaction["id"])
+                        yield _format_event(transaction)
+                yield ": keepalive\n\n"
+                continue
+            if transaction["id"] in waiting:
+                waiting.discard(transaction["id"])
+                yield _format_event(transaction)
+
+        if waiting:
+            yield f"event: timeout\ndata: {json.dumps({'pending': sorted(waiting)})}\n\n"
+    finally:
+        broker.unsubscribe(transaction_ids, queue)
+
+def _parse_stats_time(value):
+    # Rollup hours are in the server's local time, like stored timestamps, so
+    # a time with a UTC offset is converted to local time first
+    parsed = datetime.fromisoformat(value)
+    if parsed.tzinfo is not None:
+        parsed = parsed.astimezone().replace(tzinfo=None)
+    return parsed
+
+@api_view(['GET'])
+def transaction_stats(request):
+    """
+    Dashboard statistics for ?start=&end= (ISO times, default the last
+    STATS_DEFAULT_HOURS hours), read from the hourly rollups.
+    """
+    try:
+        try:
+            end = _parse_stats_time(request.query_params['end']) if 'end' in request.query_params else datetime.now()
+            start = (_parse_stats_time(request.query_params['start']) if 'start' in request.query_params
+                     else end - timedelta(hours=settings.STATS_DEFAULT_HOURS))
+            top = int(request.query_params.get('top', 10))
+        except ValueError as e:
+            return Response(
+                {"error": "Invalid query parameter", "detail": str(e)},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+        if end - start > timedelta(hours=settings.STATS_MAX_HOURS):
+            return Response(
+                {"error": "Invalid query parameter",
+                 "detail": f"start to end may span at most {settings.STATS_MAX_HOURS} hours"},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+
+        top = max(1, min(top, settings.STATS_MAX_TOP))
+
+        mongo_db = MongoDB()
+        if not mongo_db.is_connected():
+            logger.error("MongoDB is not connected")
+            return Response(
+                {"error": "Database connection not available"},
+                status=status.HTTP_503_SERVICE_UNAVAILABLE
+            )
+
+        stats = query_stats(mongo_db, hour_of(start.isoformat()), hour_of(end.isoformat()), top)
+        return Response({"start": start.isoformat(), "end": end.isoformat(), **stats})
+
+    except Exception as e:
+        logger.error(f"Error in transaction_stats: {e}", exc_info=True)
+        return Response(
+            {"error": "Server error", "detail": str(e)},
+            status=status.HTTP_500_INTERNAL_SERVER_ERROR
+        )
+
+def _health_status(mongodb_state, is_gemini_configured):
+    # Report "starting" rather than a failure until the first probe has run
+    if mongodb_state["state"] == "starting":
+        return "starting"
+    return "healthy" if (mongodb_state["connected"] and is_gemini_configured) else "degraded"
+
+@api_view(['GET'])
+def health_check(request):
+    try:
+        # Answer from the background probe's cached state
+        mongodb_state = get_health_monitor().snapshot()
+
         # Check Gemini configuration
         is_gemini_configured = bool(settings.GEMINI_API_KEY)
+        model_status = get_model_status()
 
         status_response = {
-            "status": "healthy" if (is_db_connected and is_gemini_configured) else "degraded",
-            "mongodb": {
-                "connected": is_db_connected,
-                "collection_available": collection_available
-            },
+            "status": _health_status(mongodb_state, is_gemini_configured),
+            "mongodb": mongodb_state,
             "gemini": "configured" if is_gemini_configured else "not configured",
+            "model": {
+                "state": "failing" if model_status["consecutive_failures"] else "ok",
+                **model_status
+            },
             "timestamp": datetime.now().isoformat()
         }
 
+        job_queue = current_job_queue()
+        if job_queue is not None:
+            status_response["scoring_queue"] = {"depth": job_queue.depth()}
+
+        shadow_scorer = current_shadow_scorer()
+        if shadow_scorer is not None:
+            status_response["shadow_scoring"] = shadow_scorer.status()
+
         return Response(status_response)
 
     except Exception as e:
@@ -182,4 +442,4 @@ def health_check(request):
             "mongodb": "disconnected",
             "gemini": "unknown",
             "timestamp": datetime.now().isoformat()
-        }, status=status.HTTP_500_INTERNAL_SERVER_ERROR) 
\ No newline at end of file
+        }, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
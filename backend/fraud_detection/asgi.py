@@ -14,3 +14,8 @@ from django.core.asgi import get_asgi_application
 os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'fraud_detection.settings')
 
 application = get_asgi_application()
+
+# Gunicorn starts these in each worker after forking instead (see gunicorn.conf.py)
+if not os.environ.get('SERVER_LIFECYCLE_HOOKS'):
+    from api.lifecycle import start_background
+    start_background()
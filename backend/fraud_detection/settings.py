@@ -190,3 +190,60 @@ except Exception as e:
 
 # Gemini AI settings
 GEMINI_API_KEY = os.getenv('GEMINI_API_KEY', '')
+
+# Asynchronous scoring settings
+# When enabled, POST /api/transaction returns 202 with a Pending document and
+# the analysis runs in a background worker pool (see api/jobs.py).
+ASYNC_SCORING = os.getenv('ASYNC_SCORING', 'False') == 'True'
+SCORING_WORKERS = int(os.getenv('SCORING_WORKERS', '4'))
+SCORING_QUEUE_MAX_SIZE = int(os.getenv('SCORING_QUEUE_MAX_SIZE', '1000'))
+SCORING_JOB_MAX_RETRIES = int(os.getenv('SCORING_JOB_MAX_RETRIES', '3'))
+SCORING_JOB_RETRY_DELAY = float(os.getenv('SCORING_JOB_RETRY_DELAY', '2.0'))
+# Queued jobs are leased to their process for this long and renewed while it
+# runs; jobs whose lease expires are taken over by another process
+SCORING_JOB_LEASE_SECONDS = int(os.getenv('SCORING_JOB_LEASE_SECONDS', '60'))
+
+# Push-based status updates (GET /api/events)
+EVENTS_MAX_IDS = int(os.getenv('EVENTS_MAX_IDS', '50'))
+EVENTS_STREAM_TIMEOUT = int(os.getenv('EVENTS_STREAM_TIMEOUT', '300'))
+EVENTS_KEEPALIVE_SECONDS = int(os.getenv('EVENTS_KEEPALIVE_SECONDS', '15'))
+# Feed completed transactions from a MongoDB change stream so subscribers on
+# one worker process see results written by another (requires a replica set)
+EVENTS_CHANGE_STREAM = os.getenv('EVENTS_CHANGE_STREAM', 'False') == 'True'
+
+# Health monitoring
+# /api/health answers from state refreshed by a background probe on this interval
+HEALTH_PROBE_INTERVAL = float(os.getenv('HEALTH_PROBE_INTERVAL', '5'))
+HEALTH_LATENCY_HISTORY = int(os.getenv('HEALTH_LATENCY_HISTORY', '20'))
+
+# Shadow scoring
+# Dotted path of a candidate scorer with the same signature as
+# analyze_transaction. When set, a sample of live transactions is also scored
+# by the candidate off the request path and stored in shadow_results.
+SHADOW_SCORER = os.getenv('SHADOW_SCORER', '')
+SHADOW_SAMPLE_RATE = float(os.getenv('SHADOW_SAMPLE_RATE', '0.1'))
+SHADOW_MAX_WORKERS = int(os.getenv('SHADOW_MAX_WORKERS', '2'))
+# Sampled transactions beyond this many in flight are skipped, not queued
+SHADOW_MAX_PENDING = int(os.getenv('SHADOW_MAX_PENDING', '100'))
+
+# Aggregate statistics (/api/stats)
+STATS_DEFAULT_HOURS = int(os.getenv('STATS_DEFAULT_HOURS', '24'))
+STATS_MAX_TOP = int(os.getenv('STATS_MAX_TOP', '100'))
+# Longest ?start= to ?end= range /api/stats accepts
+STATS_MAX_HOURS = int(os.getenv('STATS_MAX_HOURS', str(31 * 24)))
+# Sender/receiver counters are kept per address for this many hours, then
+# `manage.py compact_stats` folds each hour into its top STATS_PARTY_TOP_K
+STATS_PARTY_LIVE_HOURS = int(os.getenv('STATS_PARTY_LIVE_HOURS', '24'))
+STATS_PARTY_TOP_K = int(os.getenv('STATS_PARTY_TOP_K', '100'))
+
+# Transaction history listing (GET /api/transactions)
+TRANSACTIONS_PAGE_SIZE = int(os.getenv('TRANSACTIONS_PAGE_SIZE', '50'))
+TRANSACTIONS_PAGE_SIZE_MAX = int(os.getenv('TRANSACTIONS_PAGE_SIZE_MAX', '200'))
+
+# Retention
+# Transactions older than TRANSACTION_HOT_DAYS are moved out of MongoDB by
+# `manage.py archive_transactions` into gzipped JSON-lines files, one per day,
+# under ARCHIVE_DIR. /api/status falls back to the archive for those ids.
+TRANSACTION_HOT_DAYS = int(os.getenv('TRANSACTION_HOT_DAYS', '30'))
+ARCHIVE_DIR = Path(os.getenv('ARCHIVE_DIR', BASE_DIR / 'archive'))
+ARCHIVE_BATCH_SIZE = int(os.getenv('ARCHIVE_BATCH_SIZE', '1000'))
@@ -0,0 +1,65 @@
+"""
+Gunicorn configuration for production serving. Run from the backend directory:
+
+    gunicorn fraud_detection.wsgi
+
+The app is preloaded in the master and shared with workers copy-on-write.
+Each worker resets inherited clients after fork and drains queued scoring
+work on graceful shutdown (see api/lifecycle.py).
+"""
+import multiprocessing
+import os
+
+# Background threads are started per worker by post_fork, not when the
+# master loads the application (see fraud_detection/wsgi.py)
+os.environ['SERVER_LIFECYCLE_HOOKS'] = '1'
+
+bind = os.getenv('BIND', '0.0.0.0:8000')
+
+# Scoring is dominated by waiting on Gemini and MongoDB, so each worker runs
+# several threads. /api/events (server-sent events) is only served under
+# ASGI; to enable it run fraud_detection.asgi:application with
+# WORKER_CLASS=uvicorn.workers.UvicornWorker. Under WSGI the endpoint
+# returns 501 and the frontend polls instead.
+worker_class = os.getenv('WORKER_CLASS', 'gthread')
+workers = int(os.getenv('WEB_CONCURRENCY', multiprocessing.cpu_count() * 2 + 1))
+threads = int(os.getenv('WEB_THREADS', '8'))
+
+preload_app = True
+
+# Synchronous scoring waits on the model, so allow long requests
+timeout = int(os.getenv('WEB_TIMEOUT', '120'))
+graceful_timeout = int(os.getenv('WEB_GRACEFUL_TIMEOUT', '30'))
+max_requests = int(os.getenv('WEB_MAX_REQUESTS', '0'))
+max_requests_jitter = int(os.getenv('WEB_MAX_REQUESTS_JITTER', '0'))
+
+
+def when_ready(server):
+    from api.lifecycle import preload
+    preload()
+
+
+# Seconds of graceful_timeout kept spare for the worker to exit after draining
+SHUTDOWN_MARGIN = 2
+
+
+def post_fork(server, worker):
+    from api.lifecycle import after_fork
+    after_fork()
+
+
+def post_worker_init(worker):
+    # The master's graceful_timeout starts when it sends SIGTERM, so note that
+    # moment. Both the gthread and uvicorn workers call this hook after setting
+    # up their own signal handling, which the watcher then chains to.
+    from api.lifecycle import watch_shutdown_signals
+    watch_shutdown_signals()
+
+
+def worker_exit(server, worker):
+    # In-flight requests have finished by now; drain background work with what
+    # is left of graceful_timeout so the master does not kill us mid-drain.
+    # Jobs still queued when time runs out stay leased in MongoDB and are
+    # recovered by another worker once the lease expires.
+    from api.lifecycle import remaining_budget, shutdown
+    shutdown(timeout=remaining_budget(graceful_timeout, SHUTDOWN_MARGIN))
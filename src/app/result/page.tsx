@@ -62,6 +62,18 @@ export default function ResultPage() {
           throw new Error(data.error || `Server error: ${response.status}`);
         }
 
+        // Async scoring: keep polling until a worker has scored the transaction
+        if (data.status === 'Pending' || data.status === 'Scoring') {
+          console.log("Transaction still being analyzed, retrying...");
+          return false;
+        }
+
+        if (data.status === 'Failed') {
+          setError(data.error || 'Transaction analysis failed. Please try again.');
+          setLoading(false);
+          return true;
+        }
+
         setResult(data);
         setLoading(false);
         return true;
@@ -88,10 +100,35 @@ export default function ResultPage() {
       }
     };
 
-    poll();
+    // Prefer a pushed result over polling; fall back to polling if the
+    // event stream is unavailable or times out
+    let events: EventSource | null = null;
+    if (retryCount === 0 && typeof EventSource !== 'undefined') {
+      events = new EventSource(`http://localhost:8000/api/events?ids=${transactionId}`);
+      events.addEventListener('transaction', (event) => {
+        const data = JSON.parse((event as MessageEvent).data);
+        events?.close();
+        if (!mounted) return;
+        if (data.status === 'Failed') {
+          setError(data.error || 'Transaction analysis failed. Please try again.');
+        } else {
+          setResult(data);
+        }
+        setLoading(false);
+      });
+      const fallBackToPolling = () => {
+        events?.close();
+        if (mounted) poll();
+      };
+      events.addEventListener('timeout', fallBackToPolling);
+      events.onerror = fallBackToPolling;
+    } else {
+      poll();
+    }
 
     return () => {
       mounted = false;
+      events?.close();
       if (timeoutId) {
         clearTimeout(timeoutId);
       }